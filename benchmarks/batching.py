@@ -0,0 +1,76 @@
+# Throughput and peak memory of length-bucketed batches vs one padded batch.
+# usage (from the repository root): python -m benchmarks.batching [reviews] [runs]
+from multiprocessing import get_context
+import resource
+import random
+import time
+import sys
+
+
+def make_reviews(count: int, seed: int = 0) -> list[str]:
+    # mostly short reviews with a long tail, like flipkart listings
+    import json
+
+    words = [w for w in json.load(open("ml-models/vocab.json")) if w.isalpha()]
+    rng = random.Random(seed)
+    reviews = []
+    for _ in range(count):
+        if rng.random() < 0.02:
+            length = rng.randint(800, 2000)
+        else:
+            length = max(1, int(rng.lognormvariate(2.8, 0.9)))
+        reviews.append(" ".join(rng.choices(words, k=length)))
+    return reviews
+
+
+def run(mode: str, count: int, runs: int, results) -> None:
+    import ml_models
+
+    reviews = make_reviews(count)
+    if mode == "unpadded":
+        # reference scores: every review on its own, so no padding is involved
+        ml_models.MODEL_MAX_BATCH_TOKENS = 0
+        ml_models.MODEL_MAX_SEQ_LEN = None
+    if mode == "single":
+        # previous behaviour: everything padded to the longest review, no truncation
+        ml_models.MODEL_MAX_BATCH_TOKENS = float("inf")
+        ml_models.MODEL_MAX_SEQ_LEN = None
+
+    ml_models.get_scores(reviews[:8])
+    started = time.perf_counter()
+    for _ in range(runs):
+        sentiment, verifier = ml_models.get_scores(reviews)
+    elapsed = time.perf_counter() - started
+
+    results.put({
+        "mode": mode,
+        "reviews_per_s": count * runs / elapsed,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "sentiment": sentiment,
+    })
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    # every mode runs in its own process so peak rss is not shared
+    ctx = get_context("spawn")
+    results = ctx.Queue()
+    outcome = {}
+    for mode in ("unpadded", "single", "bucketed"):
+        proc = ctx.Process(target=run, args=(mode, count, runs, results))
+        proc.start()
+        outcome[mode] = results.get()
+        proc.join()
+
+    for mode, res in outcome.items():
+        print(f"{mode:>9}: {res['reviews_per_s']:8.1f} reviews/s, peak rss {res['peak_rss_mb']:7.1f}MB")
+    # padding tokens take part in the convolutions, so padding shifts the scores
+    reference = outcome["unpadded"]["sentiment"]
+    for mode in ("single", "bucketed"):
+        errors = [abs(a - b) for a, b in zip(reference, outcome[mode]["sentiment"])]
+        print(
+            f"{mode:>9}: sentiment vs unpadded, mean abs diff {sum(errors) / len(errors):.4f},"
+            f" max {max(errors):.4f}"
+        )
@@ -0,0 +1,52 @@
+# Page load time and bytes transferred per review page, full vs lean browser profile.
+# usage (from the repository root): python -m benchmarks.browser_profile <product-review-url> [pages]
+from scraper import *
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+import statistics
+import shutil
+import sys
+
+
+# bytes of the document and every resource the page fetched so far, blocked
+# requests never show up here
+TRANSFERRED_JS = """
+return performance.getEntriesByType("navigation")
+    .concat(performance.getEntriesByType("resource"))
+    .reduce((total, entry) => total + (entry.transferSize || 0), 0);
+"""
+
+
+def bench(name: str, lean: bool, url: str, pages: int) -> None:
+    profile_dir = tempfile.mkdtemp(prefix=DRIVER_PROFILE_PREFIX)
+    driver = make_webdriver(profile_dir=profile_dir, lean=lean)
+    load_times, transferred, reviews = [], [], 0
+    try:
+        for page in range(1, pages + 1):
+            started = time.perf_counter()
+            # navigation plus the wait for the review DOM, as in scrape_single_page
+            driver.get(f"{url}&page={page}")
+            WebDriverWait(driver, timeout=8.0).until(
+                EC.presence_of_all_elements_located((By.CSS_SELECTOR, REVIEW_SELECTORS["review"]))
+            )
+            load_times.append(time.perf_counter() - started)
+            transferred.append(driver.execute_script(TRANSFERRED_JS))
+            reviews += len(extract_page_reviews(driver, page))
+    finally:
+        driver.quit()
+        shutil.rmtree(profile_dir, ignore_errors=True)
+
+    print(
+        f"{name:>5}: load p50 {statistics.median(load_times) * 1000:7.0f}ms"
+        f"  max {max(load_times) * 1000:7.0f}ms"
+        f"  {statistics.mean(transferred) / 1024:8.0f}KB/page  {reviews} reviews"
+    )
+
+
+if __name__ == "__main__":
+    url = sys.argv[1]
+    pages = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    bench("full", False, url, pages)
+    bench("lean", True, url, pages)
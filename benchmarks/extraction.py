@@ -0,0 +1,46 @@
+# Per-page review extraction time, single script round trip vs walking elements.
+# usage (from the repository root): python -m benchmarks.extraction <review-page-url> [runs]
+from scraper import *
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+import statistics
+import sys
+
+
+def time_extractor(extract, driver, runs: int) -> list[float]:
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        raw_reviews = extract(driver)
+        [parse_raw_review(raw) for raw in raw_reviews]
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+if __name__ == "__main__":
+    url = sys.argv[1]
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    with driver_pool.lease() as driver:
+        driver.get(url)
+        WebDriverWait(driver, timeout=8.0).until(
+            EC.presence_of_all_elements_located(
+                (By.CSS_SELECTOR, REVIEW_SELECTORS["review"])
+            )
+        )
+        review_count = len(driver.find_elements(By.CSS_SELECTOR, REVIEW_SELECTORS["review"]))
+
+        extractors = {
+            "per-element": extract_raw_reviews_by_element,
+            "single-script": lambda d: d.execute_script(EXTRACT_REVIEWS_JS, REVIEW_SELECTORS),
+        }
+        print(f"{review_count} reviews on page, {runs} runs")
+        for name, extract in extractors.items():
+            timings = time_extractor(extract, driver, runs)
+            print(
+                f"{name:>14}: median {statistics.median(timings):8.1f}ms"
+                f"  min {min(timings):8.1f}ms  max {max(timings):8.1f}ms"
+            )
+
+    driver_pool.close()
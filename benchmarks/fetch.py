@@ -0,0 +1,36 @@
+# Review pages per second through plain http vs a pooled browser.
+# usage (from the repository root): python -m benchmarks.fetch <product-review-url> [pages]
+from scraper import *
+import resource
+import sys
+
+
+def bench(name: str, scrape_page, url: str, pages: int) -> None:
+    started = time.perf_counter()
+    cpu_started = time.process_time()
+    reviews = sum(len(scrape_page(url, page) or []) for page in range(1, pages + 1))
+    wall = time.perf_counter() - started
+    cpu = time.process_time() - cpu_started
+    print(
+        f"{name:>8}: {pages / wall:6.2f} pages/s, {pages / max(cpu, 1e-9):7.2f} pages/cpu-s,"
+        f" {reviews} reviews"
+    )
+
+
+def browser_page(url: str, page: int):
+    with driver_pool.lease() as driver:
+        return scrape_single_page(driver, url, page)
+
+
+if __name__ == "__main__":
+    url = sys.argv[1]
+    pages = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    bench("http", scrape_single_page_http, url, pages)
+    # warm one browser first so startup is not part of the measurement
+    driver_pool.warm(1)
+    bench("browser", browser_page, url, pages)
+    driver_pool.close()
+    # chromium runs in child processes, their peak rss is reported separately
+    print(f"peak rss: api {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // 1024}MB,"
+          f" children {resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss // 1024}MB")
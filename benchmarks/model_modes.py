@@ -0,0 +1,84 @@
+# Score drift against the fp32 models, latency and peak memory for each MODEL_MODE.
+# usage (from the repository root): python -m benchmarks.model_modes [reviews.txt] [batch] [threads]
+# reviews.txt holds one review per line, a fixed synthetic set is used without it
+from multiprocessing import get_context
+import statistics
+import resource
+import time
+import sys
+
+from benchmarks.batching import make_reviews
+
+
+MODES = ("fp32", "optimized", "int8")
+
+
+def run(mode: str, reviews: list[str], batch: int, threads: int | None, results) -> None:
+    # the mode and thread count are read when ml_models is imported
+    import constants
+
+    constants.MODEL_MODE = mode
+    constants.TORCH_NUM_THREADS = threads
+    started = time.perf_counter()
+    import ml_models
+
+    loaded = time.perf_counter() - started
+    ml_models.get_scores(reviews[:batch])
+    ml_models.get_scores(reviews[:batch])
+
+    latencies = []
+    sentiment, verifier = [], []
+    for start in range(0, len(reviews), batch):
+        chunk = reviews[start:start + batch]
+        started = time.perf_counter()
+        chunk_sentiment, chunk_verifier = ml_models.get_scores(chunk)
+        latencies.append((time.perf_counter() - started) * 1000)
+        sentiment += chunk_sentiment
+        verifier += chunk_verifier
+
+    results.put({
+        "load_s": loaded,
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": statistics.quantiles(latencies, n=20)[-1] if len(latencies) > 1 else latencies[0],
+        "reviews_per_s": len(reviews) / (sum(latencies) / 1000),
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "scores": {"sentiment": sentiment, "verifier": verifier},
+    })
+
+
+def drift(reference: list[float], scores: list[float]) -> str:
+    errors = [abs(a - b) for a, b in zip(reference, scores)]
+    flips = sum((a >= 0.5) != (b >= 0.5) for a, b in zip(reference, scores))
+    return f"mean {sum(errors) / len(errors):.5f} max {max(errors):.5f} flips {flips}"
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] != "-":
+        with open(sys.argv[1]) as f:
+            reviews = [line.strip() for line in f if line.strip()]
+    else:
+        reviews = make_reviews(2000, seed=16)
+    batch = int(sys.argv[2]) if len(sys.argv) > 2 else 64
+    threads = int(sys.argv[3]) if len(sys.argv) > 3 else None
+
+    # every mode runs in its own process so peak rss is not shared
+    ctx = get_context("spawn")
+    results = ctx.Queue()
+    outcome = {}
+    for mode in MODES:
+        proc = ctx.Process(target=run, args=(mode, reviews, batch, threads, results))
+        proc.start()
+        outcome[mode] = results.get()
+        proc.join()
+
+    print(f"{len(reviews)} reviews, batches of {batch}, threads {threads or 'default'}")
+    for mode, res in outcome.items():
+        print(
+            f"{mode:>9}: load {res['load_s']:5.2f}s  p50 {res['p50_ms']:7.1f}ms"
+            f"  p95 {res['p95_ms']:7.1f}ms  {res['reviews_per_s']:7.0f} reviews/s"
+            f"  peak rss {res['peak_rss_mb']:6.0f}MB"
+        )
+    reference = outcome["fp32"]["scores"]
+    for mode in MODES[1:]:
+        for model in ("sentiment", "verifier"):
+            print(f"{mode:>9}: {model:>9} vs fp32, {drift(reference[model], outcome[mode]['scores'][model])}")
@@ -0,0 +1,126 @@
+# Wall clock of a product scrape with the shared page queue against the previous
+# fixed page range per thread, over simulated pages (no browser or network).
+# usage (from the repository root): python -m benchmarks.page_queue
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+
+import scraper
+from scraper import FlipkartReview, PageQueue, scrape_queued_pages
+from constants import MAX_EMPTY_PAGE_COUNT, MAX_REVIEW_PAGES, NUM_THREADS, PAGE_MAX_ATTEMPTS
+
+
+URL = "https://www.flipkart.com/item/product-reviews/x?pid=1"
+
+
+# `real_pages` pages hold reviews, `slow` pages take `slow_seconds` to load and
+# `flaky` pages raise on their first load
+class FakeSite:
+    def __init__(self, real_pages: int, slow=(), slow_seconds=0.0, flaky=()):
+        self.real_pages = real_pages
+        self.slow = set(slow)
+        self.slow_seconds = slow_seconds
+        self.flaky = set(flaky)
+        self.loads = 0
+        self._lock = threading.Lock()
+
+    def scrape_single_page(self, driver, url: str, page: int) -> list[FlipkartReview]:
+        with self._lock:
+            self.loads += 1
+            flaky = page in self.flaky
+            self.flaky.discard(page)
+        time.sleep(self.slow_seconds if page in self.slow else 0.3)
+        if flaky:
+            raise RuntimeError("tab crashed")
+        if page > self.real_pages:
+            return []
+        return [
+            FlipkartReview(text=f"review {page}.{i}", user="u", rating="5", time="t", ldr=[0, 0], score=None, final=None)
+            for i in range(10)
+        ]
+
+
+class FakePool:
+    def acquire(self, use_proxy=False, owner=None):
+        return object()
+
+    def release(self, driver, broken=False):
+        pass
+
+
+def static_split(page_count: int) -> list[tuple[int, int]]:
+    # the previous utils.batch_pages
+    per_thread, remainder = divmod(page_count, NUM_THREADS)
+    batches, start = [], 1
+    for i in range(NUM_THREADS):
+        end = start + per_thread + (i < remainder)
+        if start < end:
+            batches.append((start, end - 1))
+        start = end
+    return batches
+
+
+def scrape_static_range(url: str, start: int, end: int) -> list[FlipkartReview]:
+    # the previous scrape_multiple_pages: inline retries, empty pages counted per thread
+    reviews, empty_page_count = [], 0
+    for page in range(start, end + 1):
+        page_reviews = []
+        for retry in range(PAGE_MAX_ATTEMPTS):
+            try:
+                page_reviews = scraper.scrape_single_page(None, url, page)
+                break
+            except Exception:
+                if retry < PAGE_MAX_ATTEMPTS - 1:
+                    time.sleep(1)
+        reviews.extend(page_reviews)
+        if not page_reviews:
+            empty_page_count += 1
+            if empty_page_count >= MAX_EMPTY_PAGE_COUNT:
+                break
+    return reviews
+
+
+def run_static(page_count: int) -> list[FlipkartReview]:
+    with ThreadPoolExecutor(NUM_THREADS) as executor:
+        futures = [
+            executor.submit(scrape_static_range, URL, start, end)
+            for start, end in static_split(page_count)
+        ]
+        return [review for future in futures for review in future.result()]
+
+
+def run_queue(page_count: int) -> list[FlipkartReview]:
+    pages = PageQueue(range(1, page_count + 1), PAGE_MAX_ATTEMPTS, MAX_EMPTY_PAGE_COUNT, 1.0)
+    thread_count = min(NUM_THREADS, page_count)
+    with ThreadPoolExecutor(thread_count) as executor:
+        for future in [
+            executor.submit(scrape_queued_pages, URL, pages, thread_id)
+            for thread_id in range(thread_count)
+        ]:
+            future.result()
+    return pages.reviews()
+
+
+SCENARIOS = {
+    "accurate page count": dict(real_pages=MAX_REVIEW_PAGES),
+    "3 of 10 pages real": dict(real_pages=3),
+    "first pages slow": dict(real_pages=MAX_REVIEW_PAGES, slow=(1, 2, 3), slow_seconds=2.0),
+    "2 flaky pages": dict(real_pages=MAX_REVIEW_PAGES, flaky=(2, 5)),
+}
+
+
+if __name__ == "__main__":
+    import logging
+
+    logging.disable(logging.WARNING)
+    scraper.driver_pool = FakePool()
+    scraper.FETCH_MODE = "browser"
+    print(f"{NUM_THREADS} threads, {MAX_REVIEW_PAGES} reported pages")
+    for name, site_args in SCENARIOS.items():
+        for mode, run in (("static", run_static), ("queue", run_queue)):
+            site = FakeSite(**site_args)
+            scraper.scrape_single_page = site.scrape_single_page
+            started = time.perf_counter()
+            reviews = run(MAX_REVIEW_PAGES)
+            elapsed = time.perf_counter() - started
+            print(f"{name:>20} {mode:>6}: {elapsed:5.2f}s, {site.loads:2} page loads, {len(reviews)} reviews")
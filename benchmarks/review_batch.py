@@ -0,0 +1,92 @@
+# Scoring, aggregates and memory of ReviewBatch against one dict per review.
+# usage (from the repository root): python -m benchmarks.review_batch [reviews] [runs]
+import tracemalloc
+import random
+import time
+import sys
+
+import numpy as np
+
+from utils import FlipkartReview, ReviewBatch, ReviewStats, score_reviews
+
+
+GRADS = {"ldr": 0.0829, "eng": 0.4726, "len": 0.0363, "sent": 0.3277, "plag": 0.4035}
+
+
+def make_reviews(count: int, seed: int = 0) -> list[FlipkartReview]:
+    rng = random.Random(seed)
+    return [
+        FlipkartReview(
+            text="nice product " * rng.randint(1, 40),
+            user=f"user {i}",
+            rating=str(rng.randint(1, 5)),
+            time="3 months ago",
+            ldr=[rng.randint(0, 50), rng.randint(0, 10)],
+            score=None,
+            final=None,
+        )
+        for i in range(count)
+    ]
+
+
+def per_review(reviews: list[FlipkartReview], model_scores: list[tuple[float, float]]) -> dict:
+    # the previous path: a score dict on every review and python loops throughout
+    likes = sum(r.ldr[0] for r in reviews)
+    dislikes = sum(r.ldr[1] for r in reviews)
+    overall = (likes - dislikes) / (likes + dislikes) if likes + dislikes else 0.0
+    for review, (sent, plag) in zip(reviews, model_scores):
+        votes = review.ldr[0] + review.ldr[1]
+        single = (review.ldr[0] - review.ldr[1]) / votes if votes else 0.0
+        review.score = {
+            "ldr": 1.0 - abs(single - overall),
+            "eng": min(votes / 10, 1.0),
+            "len": min(len(review.text) / 300, 1.0),
+            "sent": sent,
+            "plag": plag,
+        }
+        review.final = min(sum(GRADS[k] * review.score[k] for k in GRADS), 1.0)
+    return {
+        "sent": sum(r.score["sent"] for r in reviews) / len(reviews),
+        "final": sum(r.final for r in reviews) / len(reviews),
+        "fake": sum(r.score["plag"] > 0.5 for r in reviews),
+    }
+
+
+def columnar(reviews: list[FlipkartReview], model_scores: list[tuple[float, float]]) -> tuple[ReviewBatch, ReviewStats]:
+    batch = ReviewBatch.from_reviews(reviews)
+    score_reviews(batch)
+    columns = list(zip(*model_scores))
+    batch.scores["sent"][:] = columns[0]
+    batch.scores["plag"][:] = columns[1]
+    final = sum(grad * batch.scores[key] for key, grad in GRADS.items())
+    batch.final = np.minimum(final, 1.0)
+    stats = ReviewStats()
+    stats.add_scores(batch)
+    return batch, stats
+
+
+def measure(fn, *args) -> tuple[float, float]:
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = fn(*args)
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del result
+    return elapsed, peak / 2**20
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    rng = random.Random(1)
+    model_scores = [(rng.random(), rng.random()) for _ in range(count)]
+
+    for name, fn in (("per-review", per_review), ("columnar", columnar)):
+        timings = []
+        for _ in range(runs):
+            reviews = make_reviews(count)
+            timings.append(measure(fn, reviews, model_scores))
+        elapsed = min(t for t, _ in timings)
+        peak = max(m for _, m in timings)
+        print(f"{name:>10}: {count} reviews in {elapsed * 1000:8.1f}ms, peak extra memory {peak:7.1f}MB")
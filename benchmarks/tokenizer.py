@@ -0,0 +1,86 @@
+# Token id parity of the fast encoder with word_tokenize, and tokens per second of both.
+# usage (from the repository root): python -m benchmarks.tokenizer [reviews.txt] [runs]
+# reviews.txt holds one review per line, a synthetic corpus is used without it
+import random
+import time
+import sys
+
+from nltk.tokenize import word_tokenize
+import ml_models
+
+
+PUNCTUATION = [",", ".", "!", "?", "!!", "...", ":", ";", "-", "(", ")", "'", '"']
+EXTRA_WORDS = [
+    "can't", "don't", "it's", "I'm", "won't", "cannot", "gonna", "wanna", "Gimme",
+    "lemme", "gotta", "d'ye", "'tis", "Rs.500", "4.5", "3,999", "$20", "5*", "10/10",
+    "a+", "co-op", "e-mail", "--", "👍", "बहुत", "😊😊", "super.", "mr.", "U.S.", "‘quoted’", "«x»", "''", "`",
+]
+
+
+def make_reviews(count: int, seed: int = 0) -> list[str]:
+    # vocabulary words mixed with punctuation, contractions, numbers and a bit of
+    # unicode, in the shapes reviews come in: one liners up to a few sentences
+    words = [w for w in ml_models.vocab if w.isalpha()]
+    rng = random.Random(seed)
+    reviews = []
+    for _ in range(count):
+        tokens = []
+        for _ in range(max(1, int(rng.lognormvariate(2.8, 0.9)))):
+            roll = rng.random()
+            word = rng.choice(EXTRA_WORDS) if roll < 0.03 else rng.choice(words)
+            if rng.random() < 0.1:
+                word = word.capitalize() if rng.random() < 0.8 else word.upper()
+            tokens.append(word)
+            if roll > 0.9:
+                tokens[-1] += rng.choice(PUNCTUATION)
+        review = " ".join(tokens)
+        if rng.random() < 0.5:
+            review += rng.choice([".", "!", " .", "?", "\n"])
+        reviews.append(review)
+    return reviews
+
+
+def reference_ids(text_list: list[str]) -> list[list[int]]:
+    limit = ml_models.MODEL_MAX_SEQ_LEN or None
+    return [
+        [ml_models.vocab.get(tk, 1) for tk in word_tokenize(text)][:limit]
+        for text in text_list
+    ]
+
+
+def fast_ids(text_list: list[str]) -> list[list[int]]:
+    ids, starts, lengths = ml_models._encode_texts(text_list)
+    return [ids[s:s + n].tolist() for s, n in zip(starts, lengths)]
+
+
+def tokens_per_second(encode, text_list: list[str], runs: int) -> float:
+    started = time.perf_counter()
+    for _ in range(runs):
+        encoded = encode(text_list)
+    elapsed = time.perf_counter() - started
+    return sum(map(len, encoded)) * runs / elapsed
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        with open(sys.argv[1]) as f:
+            reviews = [line.strip() for line in f if line.strip()]
+    else:
+        reviews = make_reviews(5000)
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    expected, actual = reference_ids(reviews), fast_ids(reviews)
+    mismatches = [i for i, (a, b) in enumerate(zip(expected, actual)) if a != b]
+    # texts with a period before their end still go through punkt
+    no_punkt = sum("." not in text.rstrip()[:-1] for text in reviews) / len(reviews)
+    print(
+        f"{len(reviews)} reviews, {sum(map(len, expected))} tokens,"
+        f" {no_punkt:.1%} without punkt, {len(mismatches)} mismatches"
+    )
+    for i in mismatches[:10]:
+        print(f"  {reviews[i]!r}\n    word_tokenize {expected[i]}\n    fast          {actual[i]}")
+
+    for name, encode in (("word_tokenize", reference_ids), ("fast", fast_ids)):
+        print(f"{name:>13}: {tokens_per_second(encode, reviews, runs):12.0f} tokens/s")
+
+    sys.exit(1 if mismatches else 0)
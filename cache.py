@@ -0,0 +1,125 @@
+from utils import *
+from collections import OrderedDict
+import threading
+import base64
+import json
+import time
+import zlib
+
+
+logger = make_logger("cache")
+
+# marks values written by `ResponseCache`, older entries are plain json
+_REDIS_VALUE_PREFIX = "z1:"
+
+
+# Size bounded LRU where every entry also expires after `ttl` seconds.
+class LocalCache:
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: OrderedDict[str, tuple[float, object]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value, ttl: float = None) -> None:
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+def encode_redis_value(value) -> str:
+    # upstash speaks REST, so the compressed bytes travel as base64 text
+    packed = zlib.compress(json.dumps(value, separators=(",", ":")).encode())
+    return _REDIS_VALUE_PREFIX + base64.b64encode(packed).decode()
+
+
+def decode_redis_value(raw: str):
+    if raw.startswith(_REDIS_VALUE_PREFIX):
+        packed = base64.b64decode(raw[len(_REDIS_VALUE_PREFIX):])
+        return json.loads(zlib.decompress(packed))
+    return json.loads(raw)
+
+
+# Analysis results in two tiers: an in-process LocalCache in front of redis.
+# Entries older than `soft_ttl` are still served but reported as stale so the
+# caller can refresh them in the background, redis drops them after `hard_ttl`.
+class ResponseCache:
+    def __init__(self, redis, local_size: int, local_ttl: float, soft_ttl: float, hard_ttl: int):
+        self.redis = redis
+        self.local = LocalCache(local_size, local_ttl)
+        self.soft_ttl = soft_ttl
+        self.hard_ttl = hard_ttl
+        self.counters = {
+            tier: {"hit": 0, "miss": 0, "stale": 0} for tier in ("local", "redis")
+        }
+
+    # returns (value, stale), value is None on a miss
+    async def get(self, key: str) -> tuple[dict | None, bool]:
+        if (entry := self.local.get(key)) is not None:
+            return self._found("local", entry)
+        self.counters["local"]["miss"] += 1
+
+        if not self.redis:
+            return None, False
+        try:
+            raw = await self.redis.get(key)
+        except Exception as e:
+            logger.warning(f"Redis get failed: {e}")
+            return None, False
+        if not raw:
+            self.counters["redis"]["miss"] += 1
+            return None, False
+
+        try:
+            entry = decode_redis_value(raw)
+        except Exception as e:
+            logger.warning(f"Dropping undecodable cache entry {key!r}: {e}")
+            self.counters["redis"]["miss"] += 1
+            return None, False
+        if "t" not in entry:
+            # written before entries carried a timestamp, serve it once and refresh
+            entry = {"t": 0, "v": entry}
+
+        self.local.set(key, entry)
+        return self._found("redis", entry)
+
+    async def set(self, key: str, value: dict) -> None:
+        entry = {"t": time.time(), "v": value}
+        self.local.set(key, entry)
+        if not self.redis:
+            return
+        try:
+            await self.redis.set(key, encode_redis_value(entry), ex=self.hard_ttl)
+            logger.info(f"Dumped data to redis for {key!r}")
+        except Exception as e:
+            logger.warning(f"Redis set failed: {e}")
+
+    def stats(self) -> dict[str]:
+        return {**self.counters, "local_entries": len(self.local)}
+
+    def _found(self, tier: str, entry: dict) -> tuple[dict, bool]:
+        stale = time.time() - entry["t"] > self.soft_ttl
+        self.counters[tier]["stale" if stale else "hit"] += 1
+        return entry["v"], stale
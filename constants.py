@@ -2,16 +2,129 @@
 HITS_PER_MINUTE = 5
 # how many threads to use for scraping (kept low for stability in containers)
 NUM_THREADS = 4
-# maximum amount of empty pages after which scraping is terminated for the thread
+# empty pages after which the reviews are taken to end at the lowest of them
 MAX_EMPTY_PAGE_COUNT = 3
 # max amount of pages that can be scraped per product
 MAX_REVIEW_PAGES = 10
+# browser attempts per page, a failed page is queued again after PAGE_RETRY_DELAY seconds
+PAGE_MAX_ATTEMPTS = 2
+PAGE_RETRY_DELAY = 1.0
 # any text above this length is given a score of 1.0 in `length_score`
 LENGTH_SCORE_NORM = 300
 # interactions for achieving 1.0 in engagement
 VOTES_NORM = 10
 # reviews to be sent to llm
 LLM_REVIEW_COUNT = 25
+# rough token budget (about four characters per token) for the reviews sent to the llm
+LLM_TOKEN_BUDGET = 4000
+# reviews sharing at least this fraction of their words with a picked review are skipped
+LLM_DUPLICATE_SIMILARITY = 0.8
+# seconds before an llm call is abandoned
+LLM_TIMEOUT = 30
+# "gemini", or "local" for an offline extractive stand-in
+LLM_BACKEND = "gemini"
+# summaries kept in memory, and for how many seconds (in memory and redis)
+SUMMARY_CACHE_LOCAL_SIZE = 1024
+SUMMARY_CACHE_TTL = 30 * 24 * 60 * 60
+# seconds the optional analysis stages may take before their empty fallback is used
+SUMMARY_STAGE_TIMEOUT = 45
+RELATED_STAGE_TIMEOUT = 45
+# scrapes (of different products) that can run at the same time, each one uses up to NUM_THREADS browsers
+SCRAPE_WORKERS = 2
+# results kept in the memory of every worker, and for how many seconds
+CACHE_LOCAL_SIZE = 256
+CACHE_LOCAL_TTL = 5 * 60
+# results older than this are served but refreshed in the background
+CACHE_SOFT_TTL = 24 * 60 * 60
+# results are dropped from redis after this many seconds
+CACHE_HARD_TTL = 7 * 24 * 60 * 60
+# scraped reviews are kept this long (seconds) so that refreshes only scrape changed pages
+REVIEW_STORE_TTL = 30 * 24 * 60 * 60
+# model scores of review texts kept in memory, and for how many seconds (in memory and redis)
+SCORE_CACHE_LOCAL_SIZE = 50_000
+SCORE_CACHE_TTL = 30 * 24 * 60 * 60
+# share model scores between workers and restarts through redis
+SCORE_CACHE_PERSIST = True
+# seconds a worker holds the redis lock of a product it is analysing
+SINGLEFLIGHT_LOCK_TTL = 10 * 60
+# how often and how long a request polls the cache while another worker analyses the product
+SINGLEFLIGHT_POLL_INTERVAL = 2
+SINGLEFLIGHT_WAIT_TIMEOUT = 10 * 60
+# analyses submitted through /analyse/jobs that run at the same time
+JOB_WORKERS = SCRAPE_WORKERS
+# jobs waiting for a worker before new submissions are rejected
+JOB_QUEUE_SIZE = 20
+# seconds a finished job is kept for the client to collect
+JOB_TTL = 30 * 60
+# seconds a rejected client is asked to wait before retrying
+JOB_RETRY_AFTER = 30
+# "http" fetches review pages without a browser and falls back to selenium when the
+# markup is missing, "browser" always uses selenium
+FETCH_MODE = "http"
+# open connections shared by all scraper threads in http mode
+FETCH_CONCURRENCY = 8
+# politeness towards a single host: requests per second and how many may burst
+FETCH_RATE_PER_HOST = 4
+FETCH_BURST_PER_HOST = 4
+# politeness towards a single host in a browser: page loads per second and burst
+BROWSER_RATE_PER_HOST = 2
+BROWSER_BURST_PER_HOST = 4
+# seconds before an http fetch is abandoned
+FETCH_TIMEOUT = 15
+# model work of concurrent requests is merged into batches of up to this many reviews,
+# a batch waits at most this many seconds for other requests to join
+INFERENCE_MAX_BATCH = 256
+INFERENCE_MAX_WAIT = 0.02
+# padded tokens (reviews x longest review) allowed in one model batch
+MODEL_MAX_BATCH_TOKENS = 16_384
+# reviews are cut to this many tokens before scoring, None keeps them whole
+MODEL_MAX_SEQ_LEN = 512
+# "background" serves requests while the models load, "eager" loads them before
+# the app accepts requests
+MODEL_LOAD_MODE = "background"
+# scoring passes run on start so the first request skips torchscript profiling
+MODEL_WARMUP_RUNS = 2
+# "fp32" runs the models as saved, "optimized" freezes them and runs
+# optimize_for_inference, "int8" also quantizes the linear layers
+MODEL_MODE = "fp32"
+# intra-op threads for torch, None keeps torch's default of one per core
+TORCH_NUM_THREADS = None
+# "local" loads the models in every api worker, "sidecar" sends scoring to one
+# `python model_server.py` process shared by all workers on this host
+MODEL_SERVING = "local"
+# unix socket the model server listens on
+MODEL_SERVER_SOCKET = "/tmp/revscan-models.sock"
+# seconds a worker waits for the model server to answer
+MODEL_SERVER_TIMEOUT = 60
 
 # if the max page count is lower than the threads present, its just a waste
 NUM_THREADS = min(NUM_THREADS, MAX_REVIEW_PAGES)
+
+# browsers kept alive by the driver pool (idle + in use), shared fairly by all requests
+DRIVER_POOL_SIZE = SCRAPE_WORKERS * NUM_THREADS
+# browsers started in the background when the api boots
+DRIVER_POOL_WARM = NUM_THREADS
+# a pooled browser is replaced after this many leases or seconds
+DRIVER_MAX_USES = 50
+DRIVER_MAX_AGE = 15 * 60
+# seconds between sweeps that retire idle browsers past DRIVER_MAX_AGE
+DRIVER_REAP_INTERVAL = 60
+# memory one chromium takes in MB, and the MB kept free when sizing a scrape's page
+# threads, scrapes get fewer threads (down to one) when memory runs short
+BROWSER_MEMORY_MB = 300
+MEMORY_RESERVE_MB = 512
+# scraping browsers skip images, media, fonts and stylesheets and return from a page
+# load once the DOM is ready
+DRIVER_LEAN = True
+# url patterns the lean browsers never request, a pattern has to match the whole url
+# so the trailing * also catches query strings like the ?q=70 on flipkart's images
+DRIVER_BLOCKED_URLS = [
+    "*.jpg*", "*.jpeg*", "*.png*", "*.gif*", "*.webp*", "*.avif*", "*.svg*", "*.ico*",
+    "*.woff*", "*.woff2*", "*.ttf*", "*.otf*",
+    "*.css*",
+    "*.mp4*", "*.webm*", "*.m3u8*", "*.mp3*",
+]
+# seconds to wait for a free browser before giving up
+DRIVER_LEASE_TIMEOUT = 120
+# prefix of the chromium profile directories created in the temp dir
+DRIVER_PROFILE_PREFIX = "revscan-chrome-"
@@ -0,0 +1,223 @@
+from utils import *
+from governor import FairSlots, governor
+from metrics import timed
+from contextlib import contextmanager
+from collections import deque
+from typing import TYPE_CHECKING
+import threading
+import shutil
+import time
+
+if TYPE_CHECKING:
+    from selenium import webdriver
+
+
+logger = make_logger("driver-pool")
+
+
+@dataclass
+class PooledDriver:
+    driver: "webdriver.Chrome"
+    profile_dir: str
+    use_proxy: bool
+    created: float
+    uses: int = 0
+
+
+# Process wide pool of warm chromium instances. At most one browser per slot of
+# `slots` is alive at any time (idle + leased + being started), leases queue fairly
+# between owners. A browser is probed before it is leased, recycled after
+# `max_uses` leases or `max_age` seconds, idle ones past `max_age` are reaped every
+# `reap_interval` seconds, and its profile directory is deleted when it is retired.
+class DriverPool:
+    def __init__(self, slots: FairSlots, max_uses: int, max_age: float, reap_interval: float):
+        self.size = slots.capacity
+        self.max_uses = max_uses
+        self.max_age = max_age
+        self.reap_interval = reap_interval
+        self._slots = slots
+        self._lock = threading.Lock()
+        self._idle: dict[bool, deque[PooledDriver]] = {False: deque(), True: deque()}
+        self._leased: dict[int, PooledDriver] = {}
+        # browsers being started outside the lock, they count against `size`
+        self._creating = 0
+        self._closed = False
+        self._stopped = threading.Event()
+        self.created = 0
+        self.retired = 0
+
+    def start(self) -> None:
+        threading.Thread(target=self._reap_periodically, name="driver-reaper", daemon=True).start()
+
+    def acquire(self, use_proxy=False, timeout=DRIVER_LEASE_TIMEOUT, owner=None) -> "webdriver.Chrome":
+        if not self._slots.acquire(owner, timeout):
+            raise TimeoutError(f"No browser available after {timeout}s")
+
+        created = False
+        try:
+            entry = self._take_idle(use_proxy)
+            if entry is None:
+                created = True
+                entry = self._create(use_proxy)
+        except Exception:
+            with self._lock:
+                self._creating -= created
+            self._slots.release()
+            raise
+
+        entry.uses += 1
+        with self._lock:
+            self._creating -= created
+            self._leased[id(entry.driver)] = entry
+        return entry.driver
+
+    def release(self, driver: "webdriver.Chrome", broken=False) -> None:
+        with self._lock:
+            entry = self._leased.pop(id(driver), None)
+        if entry is None:
+            logger.warning("Released a driver that does not belong to the pool")
+            return
+
+        try:
+            if broken or self._closed or self._expired(entry):
+                self._retire(entry)
+            else:
+                with self._lock:
+                    self._idle[entry.use_proxy].append(entry)
+            self.reap()
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def lease(self, use_proxy=False, owner=None):
+        driver = self.acquire(use_proxy, owner=owner)
+        broken = False
+        try:
+            yield driver
+        except Exception:
+            broken = True
+            raise
+        finally:
+            self.release(driver, broken=broken)
+
+    def warm(self, count: int) -> None:
+        # starts browsers ahead of time so the first requests skip chromium startup
+        count = min(count, self.size)
+        drivers = []
+        try:
+            for _ in range(count):
+                drivers.append(self.acquire(timeout=0))
+        except Exception as err:
+            logger.warning(f"Warmed only {len(drivers)}/{count} drivers | ERROR: {err}")
+        for driver in drivers:
+            self.release(driver)
+        logger.info(f"Driver pool warmed with {len(drivers)} browsers")
+
+    # retires idle browsers past `max_age`, returns how many
+    def reap(self) -> int:
+        with self._lock:
+            expired = []
+            for use_proxy, idle in self._idle.items():
+                keep = deque()
+                for entry in idle:
+                    (expired if self._expired(entry) else keep).append(entry)
+                self._idle[use_proxy] = keep
+        for entry in expired:
+            self._retire(entry)
+        if expired:
+            logger.info(f"Reaped {len(expired)} idle browsers past their age")
+        return len(expired)
+
+    def close(self) -> None:
+        self._stopped.set()
+        with self._lock:
+            self._closed = True
+            idle = [*self._idle[False], *self._idle[True]]
+            self._idle[False].clear()
+            self._idle[True].clear()
+        for entry in idle:
+            self._retire(entry)
+
+    def idle_count(self) -> int:
+        with self._lock:
+            return len(self._idle[False]) + len(self._idle[True])
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "size": self.size,
+                "idle": len(self._idle[False]) + len(self._idle[True]),
+                "leased": len(self._leased),
+                "creating": self._creating,
+                "created": self.created,
+                "retired": self.retired,
+            }
+
+    # a healthy idle browser of the requested kind, or None once room for a new one
+    # is reserved in `_creating`
+    def _take_idle(self, use_proxy: bool) -> PooledDriver | None:
+        while True:
+            with self._lock:
+                idle = self._idle[use_proxy]
+                other = self._idle[not use_proxy]
+                evict = not idle
+                if idle:
+                    entry = idle.popleft()
+                elif other and len(other) + len(self._leased) + self._creating >= self.size:
+                    # make room for a browser of the requested kind
+                    entry = other.popleft()
+                else:
+                    self._creating += 1
+                    return None
+
+            if evict:
+                self._retire(entry)
+            elif not self._expired(entry) and self._healthy(entry):
+                return entry
+            else:
+                self._retire(entry)
+
+    def _create(self, use_proxy: bool) -> PooledDriver:
+        profile_dir = tempfile.mkdtemp(prefix=DRIVER_PROFILE_PREFIX)
+        try:
+            with timed("driver_create"):
+                driver = make_webdriver(use_proxy=use_proxy, profile_dir=profile_dir)
+        except Exception:
+            shutil.rmtree(profile_dir, ignore_errors=True)
+            raise
+
+        with self._lock:
+            self.created += 1
+        return PooledDriver(driver, profile_dir, use_proxy, time.monotonic())
+
+    def _expired(self, entry: PooledDriver) -> bool:
+        return (
+            entry.uses >= self.max_uses
+            or time.monotonic() - entry.created >= self.max_age
+        )
+
+    def _healthy(self, entry: PooledDriver) -> bool:
+        try:
+            return entry.driver.execute_script("return 1") == 1
+        except Exception as err:
+            logger.warning(f"Driver failed health probe, replacing it | ERROR: {err}")
+            return False
+
+    def _reap_periodically(self) -> None:
+        while not self._stopped.wait(self.reap_interval):
+            try:
+                self.reap()
+            except Exception as err:
+                logger.warning(f"Error while reaping idle drivers | ERROR: {err}")
+
+    def _retire(self, entry: PooledDriver) -> None:
+        try:
+            entry.driver.quit()
+        except Exception as err:
+            logger.warning(f"Error while quitting driver: {err}")
+        shutil.rmtree(entry.profile_dir, ignore_errors=True)
+        with self._lock:
+            self.retired += 1
+
+
+driver_pool = DriverPool(governor.browsers, DRIVER_MAX_USES, DRIVER_MAX_AGE, DRIVER_REAP_INTERVAL)
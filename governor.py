@@ -0,0 +1,172 @@
+from utils import *
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+import threading
+import time
+
+
+logger = make_logger("governor")
+
+
+# Memory this container may still use in MB: the cgroup limit minus its usage when
+# there is one, otherwise what the kernel reports as available. None if unknown.
+def available_memory_mb() -> float | None:
+    available = []
+    try:
+        with open("/sys/fs/cgroup/memory.max") as f:
+            limit = f.read().strip()
+        if limit != "max":
+            with open("/sys/fs/cgroup/memory.current") as f:
+                available.append((int(limit) - int(f.read())) / 2**20)
+    except (OSError, ValueError):
+        pass
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    available.append(int(line.split()[1]) / 1024)
+                    break
+    except (OSError, ValueError):
+        pass
+    return min(available) if available else None
+
+
+# `capacity` slots shared by the whole process. Waiters are grouped by owner (the
+# product a request scrapes) and a freed slot goes to the owners in turn, so a
+# request that asks for many slots cannot starve the ones queued behind it.
+class FairSlots:
+    def __init__(self, name: str, capacity: int):
+        self.name = name
+        self.capacity = capacity
+        self.in_use = 0
+        self._waiters: OrderedDict[str, deque[threading.Event]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {"granted": 0, "waited": 0, "timeouts": 0, "total_wait": 0.0, "max_wait": 0.0}
+
+    def acquire(self, owner: str = None, timeout: float = None) -> bool:
+        started = time.monotonic()
+        with self._lock:
+            if self.in_use < self.capacity and not self._waiters:
+                self.in_use += 1
+                self.counters["granted"] += 1
+                return True
+            granted = threading.Event()
+            self._waiters.setdefault(owner, deque()).append(granted)
+
+        granted.wait(timeout)
+        with self._lock:
+            # the slot may have been handed over just as the wait timed out
+            if not granted.is_set():
+                queue = self._waiters[owner]
+                queue.remove(granted)
+                if not queue:
+                    del self._waiters[owner]
+                self.counters["timeouts"] += 1
+                return False
+            waited = time.monotonic() - started
+            self.counters["granted"] += 1
+            self.counters["waited"] += 1
+            self.counters["total_wait"] += waited
+            self.counters["max_wait"] = max(self.counters["max_wait"], waited)
+            return True
+
+    def release(self) -> None:
+        with self._lock:
+            if not self._waiters:
+                self.in_use -= 1
+                return
+            # the slot passes straight to the next owner, which then queues last
+            owner, queue = self._waiters.popitem(last=False)
+            queue.popleft().set()
+            if queue:
+                self._waiters[owner] = queue
+
+    @contextmanager
+    def slot(self, owner: str = None, timeout: float = None):
+        if not self.acquire(owner, timeout):
+            raise TimeoutError(f"No {self.name} slot available after {timeout}s")
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> dict[str]:
+        with self._lock:
+            waited = self.counters["waited"]
+            return {
+                **self.counters,
+                "capacity": self.capacity,
+                "in_use": self.in_use,
+                "waiting": sum(len(queue) for queue in self._waiters.values()),
+                "waiting_owners": len(self._waiters),
+                "mean_wait": self.counters["total_wait"] / waited if waited else 0,
+            }
+
+
+# Process wide budget of browsers and http fetches for all in-flight requests.
+# `admit` sizes the page threads of a scrape: an even share of the browser slots
+# between the scrapes running, and when its threads run browsers, no more than the
+# `idle_browsers` it can reuse plus the new ones free memory can hold.
+class Governor:
+    def __init__(
+        self,
+        browser_slots: int,
+        fetch_slots: int,
+        threads_per_request: int,
+        browser_memory_mb: float,
+        memory_reserve_mb: float,
+    ):
+        self.browsers = FairSlots("browser", browser_slots)
+        self.fetches = FairSlots("fetch", fetch_slots)
+        self.threads_per_request = threads_per_request
+        self.browser_memory_mb = browser_memory_mb
+        self.memory_reserve_mb = memory_reserve_mb
+        self._admitted: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.counters = {"admitted": 0, "degraded": 0}
+
+    @contextmanager
+    def admit(self, owner: str, idle_browsers: int = 0, uses_browsers: bool = True):
+        with self._lock:
+            threads = self._page_threads(idle_browsers, uses_browsers)
+            self._admitted[owner] = self._admitted.get(owner, 0) + threads
+            self.counters["admitted"] += 1
+            if threads < self.threads_per_request:
+                self.counters["degraded"] += 1
+        if threads < self.threads_per_request:
+            logger.info(f"[ITEM={owner}]: Admitted with {threads}/{self.threads_per_request} page threads")
+        try:
+            yield threads
+        finally:
+            with self._lock:
+                self._admitted[owner] -= threads
+                if not self._admitted[owner]:
+                    del self._admitted[owner]
+
+    def stats(self) -> dict[str]:
+        with self._lock:
+            admitted = {
+                **self.counters,
+                "scraping": len(self._admitted),
+                "page_threads": sum(self._admitted.values()),
+            }
+        return {
+            "browser": self.browsers.stats(),
+            "fetch": self.fetches.stats(),
+            "requests": admitted,
+            "available_memory_mb": available_memory_mb(),
+        }
+
+    def _page_threads(self, idle_browsers: int, uses_browsers: bool) -> int:
+        share = self.browsers.capacity // (len(self._admitted) + 1)
+        threads = min(self.threads_per_request, share)
+        # the idle browsers are already counted as used memory
+        if uses_browsers and (free := available_memory_mb()) is not None:
+            new_browsers = max(int((free - self.memory_reserve_mb) // self.browser_memory_mb), 0)
+            threads = min(threads, idle_browsers + new_browsers)
+        return max(threads, 1)
+
+
+governor = Governor(
+    DRIVER_POOL_SIZE, FETCH_CONCURRENCY, NUM_THREADS, BROWSER_MEMORY_MB, MEMORY_RESERVE_MB
+)
@@ -0,0 +1,55 @@
+from utils import *
+from pacing import http_pacer
+from governor import governor
+import threading
+import random
+import httpx
+
+
+logger = make_logger("http-fetcher")
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> httpx.Client:
+    # one keep-alive http/2 client shared by every scraper thread
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = httpx.Client(
+                http2=True,
+                follow_redirects=True,
+                timeout=FETCH_TIMEOUT,
+                limits=httpx.Limits(
+                    max_connections=FETCH_CONCURRENCY,
+                    max_keepalive_connections=FETCH_CONCURRENCY,
+                ),
+                headers={
+                    "User-Agent": random.choice(USER_AGENTS),
+                    "Accept": "text/html,application/xhtml+xml",
+                    "Accept-Language": "en-US,en;q=0.9",
+                },
+            )
+        return _client
+
+
+def fetch_html(url: str, owner: str = None) -> str | None:
+    # returns None when the page could not be fetched, callers fall back to a browser
+    with governor.fetches.slot(owner):
+        http_pacer.wait(url)
+        try:
+            response = get_client().get(url)
+            response.raise_for_status()
+            return response.text
+        except Exception as err:
+            logger.warning(f"Failed to fetch {url} | ERROR: {err}")
+            return None
+
+
+def close_client() -> None:
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
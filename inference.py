@@ -0,0 +1,137 @@
+from utils import *
+from metrics import request_timings, add_timings
+from concurrent.futures import Future
+from dataclasses import field
+import threading
+import queue
+import time
+
+
+logger = make_logger("inference")
+
+
+@dataclass
+class ScoringRequest:
+    texts: list[str]
+    future: Future = field(default_factory=Future)
+    enqueued: float = field(default_factory=time.monotonic)
+    # Server-Timing entries of the request that submitted the texts
+    timings: dict[str, float] | None = field(default_factory=request_timings.get)
+
+
+# Collects scoring requests of concurrent analyses into shared model batches.
+# A batch is closed when it holds `max_batch` texts or when its oldest request
+# has waited `max_wait` seconds, then it runs on one dedicated worker thread and
+# every request's future gets its slice of `score_fn`'s output.
+class InferenceScheduler:
+    def __init__(self, score_fn, max_batch: int, max_wait: float):
+        self.score_fn = score_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue: queue.Queue[ScoringRequest | None] = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._pending_texts = 0
+        self.counters = {
+            "batches": 0,
+            "requests": 0,
+            "texts": 0,
+            "last_batch_size": 0,
+            "max_batch_size": 0,
+            "total_wait": 0.0,
+            "max_wait": 0.0,
+        }
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="inference", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread:
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def submit(self, texts: list[str]) -> Future:
+        request = ScoringRequest(texts)
+        if not texts:
+            request.future.set_result(([], []))
+            return request.future
+        with self._lock:
+            self._pending_texts += len(texts)
+        self._queue.put(request)
+        return request.future
+
+    def stats(self) -> dict[str]:
+        with self._lock:
+            counters = dict(self.counters)
+            pending = self._pending_texts
+        batches, requests = counters["batches"], counters["requests"]
+        return {
+            **counters,
+            "queue_depth": self._queue.qsize(),
+            "pending_texts": pending,
+            "mean_batch_size": counters["texts"] / batches if batches else 0,
+            "mean_wait": counters["total_wait"] / requests if requests else 0,
+        }
+
+    def _run(self) -> None:
+        while (first := self._queue.get()) is not None:
+            batch = [first]
+            size = len(first.texts)
+            deadline = first.enqueued + self.max_wait
+            stop = False
+
+            while size < self.max_batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if request is None:
+                    stop = True
+                    break
+                batch.append(request)
+                size += len(request.texts)
+
+            self._run_batch(batch)
+            if stop:
+                break
+
+    def _run_batch(self, batch: list[ScoringRequest]) -> None:
+        started = time.monotonic()
+        texts = [text for request in batch for text in request.texts]
+        # the stages of a shared batch count towards every request in it
+        timings = {}
+        token = request_timings.set(timings)
+        try:
+            sentiment, verifier = self.score_fn(texts)
+        except Exception as err:
+            logger.error(f"Batch of {len(texts)} texts failed | ERROR: {err}")
+            for request in batch:
+                request.future.set_exception(err)
+            sentiment = verifier = None
+        finally:
+            request_timings.reset(token)
+        for request in batch:
+            add_timings(request.timings, timings)
+
+        start = 0
+        for request in batch:
+            end = start + len(request.texts)
+            if sentiment is not None:
+                request.future.set_result((sentiment[start:end], verifier[start:end]))
+            start = end
+
+        with self._lock:
+            self._pending_texts -= len(texts)
+            waits = [started - request.enqueued for request in batch]
+            self.counters["batches"] += 1
+            self.counters["requests"] += len(batch)
+            self.counters["texts"] += len(texts)
+            self.counters["last_batch_size"] = len(texts)
+            self.counters["max_batch_size"] = max(self.counters["max_batch_size"], len(texts))
+            self.counters["total_wait"] += sum(waits)
+            self.counters["max_wait"] = max(self.counters["max_wait"], *waits)
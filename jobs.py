@@ -0,0 +1,141 @@
+from utils import *
+from cache import encode_redis_value, decode_redis_value
+from dataclasses import asdict, field
+from uuid import uuid4
+import time
+
+
+logger = make_logger("jobs")
+
+
+@dataclass
+class Job:
+    id: str
+    url: str
+    status: str = "queued"  # queued -> running -> done | failed
+    progress: dict[str, int | bool] = field(default_factory=dict)
+    result: dict | None = None
+    error: str | None = None
+    created: float = field(default_factory=time.time)
+    finished: float | None = None
+
+    def update(self, **progress) -> None:
+        self.progress.update(progress)
+
+    def format(self) -> dict[str]:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "progress": self.progress,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+# Bounded queue of analyses processed by a fixed number of worker tasks.
+# `submit` raises asyncio.QueueFull when the queue is at capacity so callers can
+# push back on clients instead of piling up work. Every change of a job is also
+# written to redis for `ttl` seconds, so any api worker can answer for it; without
+# redis a job is only known to the worker that queued it.
+class JobQueue:
+    def __init__(self, runner, redis, workers: int, maxsize: int, ttl: float):
+        self.runner = runner
+        self.redis = redis
+        self.workers = workers
+        self.ttl = ttl
+        self.jobs: dict[str, Job] = {}
+        self._queue: asyncio.Queue[Job] = asyncio.Queue(maxsize)
+        self._tasks: list[asyncio.Task] = []
+        # one redis write per job at a time, changes made meanwhile are written after it
+        self._writes: dict[str, asyncio.Task] = {}
+        self._dirty: set[str] = set()
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def start(self) -> None:
+        self._tasks = [
+            asyncio.create_task(self._worker(i)) for i in range(self.workers)
+        ]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, url: str) -> Job:
+        self._prune()
+        job = Job(id=uuid4().hex, url=url)
+        self._queue.put_nowait(job)
+        self.jobs[job.id] = job
+        self._save(job)
+        logger.info(f"Queued job {job.id!r} for {url=}, depth={self.depth}")
+        return job
+
+    async def get(self, job_id: str) -> Job | None:
+        if (job := self.jobs.get(job_id)) is not None:
+            return job
+        if not self.redis:
+            return None
+        try:
+            raw = await self.redis.get(f"job:{job_id}")
+        except Exception as e:
+            logger.warning(f"Failed to load job {job_id!r}: {e}")
+            return None
+        return Job(**decode_redis_value(raw)) if raw else None
+
+    async def _worker(self, worker_id: int) -> None:
+        while True:
+            job = await self._queue.get()
+            job.status = "running"
+            self._save(job)
+            try:
+                job.result = await self.runner(job.url, partial(self._update, job))
+                job.status = "done"
+            except Exception as err:
+                logger.error(f"[WORKER={worker_id}] Job {job.id!r} failed | ERROR: {err}")
+                job.error = str(err)
+                job.status = "failed"
+            finally:
+                job.finished = time.time()
+                self._save(job)
+                self._queue.task_done()
+
+    def _update(self, job: Job, **progress) -> None:
+        job.update(**progress)
+        self._save(job)
+
+    def _save(self, job: Job) -> None:
+        if not self.redis:
+            return
+        if job.id in self._writes:
+            self._dirty.add(job.id)
+            return
+        self._writes[job.id] = asyncio.create_task(self._write(job))
+
+    async def _write(self, job: Job) -> None:
+        try:
+            while True:
+                self._dirty.discard(job.id)
+                try:
+                    await self.redis.set(
+                        f"job:{job.id}", encode_redis_value(asdict(job)), ex=int(self.ttl)
+                    )
+                except Exception as e:
+                    logger.warning(f"Failed to store job {job.id!r}: {e}")
+                if job.id not in self._dirty:
+                    break
+        finally:
+            del self._writes[job.id]
+
+    def _prune(self) -> None:
+        # finished jobs are kept around for `ttl` seconds so clients can collect them
+        now = time.time()
+        expired = [
+            job_id for job_id, job in self.jobs.items()
+            if job.finished and now - job.finished > self.ttl
+        ]
+        for job_id in expired:
+            del self.jobs[job_id]
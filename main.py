@@ -1,22 +1,82 @@
 
+import time
+
+# startup time is measured from here, the imports below are part of it
+STARTUP_BEGAN = time.perf_counter()
+
 from utils import *
-from scraper import scrape_reviews, get_similar_items_from_amazon
-from ml_models import get_sentiment_scores, get_verifier_scores
-from fastapi import FastAPI, Request
+from scraper import scrape_reviews, refresh_reviews, get_similar_items_from_amazon
+from driver_pool import driver_pool
+from governor import governor
+from http_fetcher import close_client
+from singleflight import SingleFlight
+from jobs import JobQueue
+from cache import ResponseCache
+from review_store import ReviewStore
+from score_cache import ScoreCache
+from inference import InferenceScheduler
+from model_loader import ModelLoader, MODEL_VERSION
+from model_server import ModelClient
+from pipeline import Pipeline, Stage
+from summarizer import Summarizer, GeminiBackend, LocalBackend
+from metrics import (
+    registry, Gauge, TimedRedis, request_timings, record_timing, server_timing_header,
+    stage_seconds, reviews_per_request, analyses,
+)
+from fastapi import FastAPI, Request, Response, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, PlainTextResponse
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
-from upstash_redis import Redis
-import google.generativeai as genai
+from upstash_redis.asyncio import Redis
 from dotenv import load_dotenv
-import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 import json
 
 
 load_dotenv()
 
-app = FastAPI()
+# blocking stages run here so that the event loop keeps serving other requests
+scrape_executor = ThreadPoolExecutor(SCRAPE_WORKERS, thread_name_prefix="scrape")
+# related item lookups run alongside the scrapes, so they get their own threads
+related_executor = ThreadPoolExecutor(SCRAPE_WORKERS, thread_name_prefix="related")
+# torch, nltk and the models are imported by the loader or by the model server,
+# never by this module
+if MODEL_SERVING == "sidecar":
+    models = ModelClient(MODEL_SERVER_SOCKET, MODEL_SERVER_TIMEOUT)
+else:
+    models = ModelLoader(MODEL_WARMUP_RUNS)
+# model work of concurrent requests is batched together on one worker thread
+inference = InferenceScheduler(models.get_scores, INFERENCE_MAX_BATCH, INFERENCE_MAX_WAIT)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    logger.info(f"App imported in {time.perf_counter() - STARTUP_BEGAN:.2f}s")
+    if MODEL_LOAD_MODE == "eager":
+        await run_blocking(None, models.load)
+    else:
+        models.start()
+    # browser startup and the llm client import happen off the request path
+    driver_pool.start()
+    scrape_executor.submit(driver_pool.warm, DRIVER_POOL_WARM)
+    asyncio.get_running_loop().run_in_executor(None, summarizer.backend.warm)
+    inference.start()
+    job_queue.start()
+    yield
+    await job_queue.stop()
+    scrape_executor.shutdown(wait=False, cancel_futures=True)
+    related_executor.shutdown(wait=False, cancel_futures=True)
+    driver_pool.close()
+    close_client()
+    inference.stop()
+    if redis:
+        await redis.close()
+
+
+app = FastAPI(lifespan=lifespan)
 limiter = Limiter(key_func=get_remote_address)
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
@@ -30,16 +90,113 @@ app.add_middleware(
 )
 
 try:
-    redis = Redis.from_env()
+    redis = TimedRedis(Redis.from_env())
     logger.info("Successfully connected to Redis")
 except Exception as e:
     logger.error(f"Failed to connect to Redis: {e}")
     redis = None
 
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-llm_model = genai.GenerativeModel("gemini-1.5-flash")
+response_cache = ResponseCache(
+    redis, CACHE_LOCAL_SIZE, CACHE_LOCAL_TTL, CACHE_SOFT_TTL, CACHE_HARD_TTL
+)
+review_store = ReviewStore(redis, REVIEW_STORE_TTL)
+score_cache = ScoreCache(
+    redis, MODEL_VERSION, SCORE_CACHE_LOCAL_SIZE, SCORE_CACHE_TTL, SCORE_CACHE_PERSIST
+)
+summarizer = Summarizer(
+    LocalBackend() if LLM_BACKEND == "local" else GeminiBackend(),
+    redis, SUMMARY_CACHE_LOCAL_SIZE, SUMMARY_CACHE_TTL, LLM_TIMEOUT,
+)
+# keeps background refreshes and analyses of disconnected streams referenced
+# until they finish
+background_tasks = set()
+
+singleflight = SingleFlight(
+    redis, SINGLEFLIGHT_LOCK_TTL, SINGLEFLIGHT_POLL_INTERVAL, SINGLEFLIGHT_WAIT_TIMEOUT
+)
 
 logger = make_logger("entry")
+APP_IMPORTED = time.perf_counter()
+
+
+# per request timings for the browser devtools, filled by `timed` stages and
+# redis calls of the request's task, of the threads it hands work to and of the
+# model batches its reviews were scored in. Streamed responses leave the header
+# off, their headers are sent before any stage ran and the stage timings come
+# with the `done` event instead.
+STREAMED_TYPES = ("text/event-stream", "application/x-ndjson")
+
+
+@app.middleware("http")
+async def server_timing(request: Request, call_next):
+    timings = {}
+    token = request_timings.set(timings)
+    started = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        request_timings.reset(token)
+    if response.headers.get("content-type", "").startswith(STREAMED_TYPES):
+        return response
+    timings["total"] = time.perf_counter() - started
+    response.headers["Server-Timing"] = server_timing_header(timings)
+    return response
+
+
+def cache_lookups() -> dict[tuple[str, str], int]:
+    response = response_cache.stats()
+    lookups = {
+        (f"response_{tier}", result): count
+        for tier in ("local", "redis")
+        for result, count in response[tier].items()
+    }
+    for name, stats in (("scores", score_cache.stats()), ("summaries", summarizer.stats())):
+        lookups[(name, "hit")] = stats["hit"]
+        lookups[(name, "miss")] = stats["miss"]
+    return lookups
+
+
+def cache_hit_ratios() -> dict[tuple[str], float]:
+    lookups = cache_lookups()
+    ratios = {}
+    for cache_name in dict.fromkeys(name for name, _ in lookups):
+        found = sum(count for (name, result), count in lookups.items() if name == cache_name and result != "miss")
+        total = found + lookups.get((cache_name, "miss"), 0)
+        ratios[(cache_name,)] = found / total if total else None
+    return ratios
+
+
+def pool_gauges() -> dict[tuple[str, str], int]:
+    drivers = driver_pool.stats()
+    slots = governor.stats()
+    queues = inference.stats()
+    return {
+        ("drivers", "idle"): drivers["idle"],
+        ("drivers", "leased"): drivers["leased"],
+        ("drivers", "size"): drivers["size"],
+        ("browser_slots", "in_use"): slots["browser"]["in_use"],
+        ("browser_slots", "waiting"): slots["browser"]["waiting"],
+        ("fetch_slots", "in_use"): slots["fetch"]["in_use"],
+        ("fetch_slots", "waiting"): slots["fetch"]["waiting"],
+        ("page_threads", "in_use"): slots["requests"]["page_threads"],
+        ("inference", "queue_depth"): queues["queue_depth"],
+        ("inference", "pending_texts"): queues["pending_texts"],
+        ("jobs", "queue_depth"): job_queue.depth,
+    }
+
+
+registry.register(Gauge(
+    "revscan_cache_lookups_total", "Cache lookups by cache and result.",
+    cache_lookups, ("cache", "result"), kind="counter",
+))
+registry.register(Gauge(
+    "revscan_cache_hit_ratio", "Share of cache lookups that found an entry.",
+    cache_hit_ratios, ("cache",),
+))
+registry.register(Gauge(
+    "revscan_resources", "Browsers, slots and queues in use right now.",
+    pool_gauges, ("resource", "state"),
+))
 
 
 @app.get("/")
@@ -47,87 +204,336 @@ def health_check():
     return {"health": "ok"}
 
 
+# unlike health_check this only passes once the models are loaded and warmed up
+@app.get("/ready")
+def readiness(response: Response):
+    status = models.status()
+    if not status["ready"]:
+        response.status_code = 503
+    startup = {"app_import": round(APP_IMPORTED - STARTUP_BEGAN, 3)}
+    if models.ready_at:
+        startup["until_ready"] = round(models.ready_at - STARTUP_BEGAN, 3)
+    return {**status, "startup": startup}
+
+
+@app.get("/cache/stats")
+def cache_stats():
+    return {
+        **response_cache.stats(),
+        "scores": score_cache.stats(),
+        "summaries": summarizer.stats(),
+    }
+
+
+# browser and fetch slots in use and waited for, and the page threads handed out
+@app.get("/scrape/stats")
+def scrape_stats():
+    return {**governor.stats(), "drivers": driver_pool.stats()}
+
+
+@app.get("/inference/stats")
+def inference_stats():
+    return inference.stats()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.post("/analyse")
 @limiter.limit(f"{HITS_PER_MINUTE}/minute")
 async def analyse(request: Request, url: UrlRequest):
     url = url.url
     url_id = get_uuid(url)
     logger.info(f"Hit with {url_id!r}, {url=}")
+    return await analyse_url(url)
+
+
+@app.post("/analyse/jobs", status_code=202)
+@limiter.limit(f"{HITS_PER_MINUTE}/minute")
+async def create_analyse_job(request: Request, url: UrlRequest):
+    url = url.url
+    try:
+        get_uuid(url)
+    except AssertionError:
+        raise HTTPException(status_code=422, detail="Not a flipkart url")
+
+    try:
+        job = job_queue.submit(url)
+    except asyncio.QueueFull:
+        raise HTTPException(
+            status_code=503,
+            detail={"error": "Too many queued analyses", "queue_depth": job_queue.depth},
+            headers={"Retry-After": str(JOB_RETRY_AFTER)},
+        )
+
+    return {"job_id": job.id, "status": job.status, "queue_depth": job_queue.depth}
+
+
+@app.get("/analyse/jobs/{job_id}")
+async def get_analyse_job(job_id: str):
+    if (job := await job_queue.get(job_id)) is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return {**job.format(), "queue_depth": job_queue.depth}
+
+
+@app.post("/analyse/stream")
+@limiter.limit(f"{HITS_PER_MINUTE}/minute")
+async def analyse_stream(request: Request, url: UrlRequest):
+    url = url.url
+    url_id = get_uuid(url)
+    logger.info(f"Stream hit with {url_id!r}, {url=}")
+
+    sse = "text/event-stream" in request.headers.get("accept", "")
+    return StreamingResponse(
+        stream_analysis(url, sse),
+        media_type="text/event-stream" if sse else "application/x-ndjson",
+    )
+
+
+# yields `page` events while the product is scraped, then `summary`, `related`
+# and finally `done` with the same payload as /analyse (or `error`)
+async def stream_analysis(url: str, sse: bool):
+    events = asyncio.Queue()
+    task = asyncio.create_task(
+        analyse_url(url, emit=lambda event, data: events.put_nowait((event, data)))
+    )
+    task.add_done_callback(lambda _: events.put_nowait(None))
+
+    try:
+        while (item := await events.get()) is not None:
+            yield format_event(*item, sse)
 
-    # Check cache only if Redis is available
-    if redis:
         try:
-            if res := redis.get(url_id):
-                logger.info(f"Returning data for {url_id!r} from cache")
-                return json.loads(res)
-        except Exception as e:
-            logger.warning(f"Redis get failed: {e}")
+            yield format_event("done", task.result(), sse)
+        except Exception as err:
+            logger.error(f"Encountered error while streaming analysis | ERROR: {err}")
+            yield format_event("error", {"error": str(err)}, sse)
+    finally:
+        # the client went away mid-stream, the analysis still finishes and fills
+        # the cache for the next request
+        if not task.done():
+            keep_in_background(task)
+        elif not task.cancelled():
+            task.exception()
+
+
+def format_event(event: str, data: dict, sse: bool) -> str:
+    if sse:
+        return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+    return json.dumps({"event": event, "data": data}) + "\n"
+
+
+# `progress(**fields)` receives stage updates and `emit(event, data)` scored pages
+# and results as soon as they are ready, both are always called on the event loop
+async def analyse_url(url: str, progress=None, emit=None) -> dict:
+    url_id = get_uuid(url)
 
-    logger.info(f"Processing {url_id!r}")
+    cached, stale = await response_cache.get(url_id)
+    if cached is not None:
+        logger.info(f"Returning {'stale ' if stale else ''}data for {url_id!r} from cache")
+        if stale:
+            refresh_in_background(url)
+        return without_timings(cached)
+
+    # concurrent requests for the same product share one analysis
+    return await singleflight.do(
+        url_id,
+        partial(run_analysis, url, progress or (lambda **fields: None), emit),
+        partial(get_cached, url_id),
+    )
+
+
+def refresh_in_background(url: str) -> None:
+    url_id = get_uuid(url)
+    task = asyncio.create_task(singleflight.do(
+        url_id,
+        partial(run_analysis, url, lambda **fields: None),
+        partial(get_cached, url_id, fresh=True),
+    ))
+    keep_in_background(task)
+
+
+def keep_in_background(task: asyncio.Task) -> None:
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    task.add_done_callback(log_background_error)
+
+
+def log_background_error(task: asyncio.Task) -> None:
+    if not task.cancelled() and (err := task.exception()) is not None:
+        logger.error(f"Encountered error in background analysis | ERROR: {err}")
+
+
+job_queue = JobQueue(analyse_url, redis, JOB_WORKERS, JOB_QUEUE_SIZE, JOB_TTL)
+
+
+async def get_cached(url_id: str, fresh=False) -> dict | None:
+    cached, stale = await response_cache.get(url_id)
+    return None if fresh and stale or cached is None else without_timings(cached)
+
+
+# results cached by earlier versions still carry the timings of their scrape
+def without_timings(result: dict) -> dict:
+    if "Timings" not in result:
+        return result
+    return {key: value for key, value in result.items() if key != "Timings"}
 
-    reviews = get_processed_reviews(url)
 
-    # If scraping failed or returned nothing, short-circuit with a friendly response
+# The analysis as a stage DAG: the amazon lookup only needs the url and starts
+# with the scrape, the model scoring starts once the reviews are in and the llm
+# summary once they are scored, as it picks the best reviews by final score.
+# Optional stages fall back to an empty value on error or timeout.
+async def run_analysis(url: str, progress, emit=None) -> dict:
+    url_id = get_uuid(url)
+    logger.info(f"Processing {url_id!r}")
+
+    async def find_related() -> list[dict]:
+        # the lookup thread keeps running after a stage timeout, so it gets the deadline too
+        deadline = time.monotonic() + RELATED_STAGE_TIMEOUT
+        items = await run_blocking(related_executor, get_similar_items_from_amazon, url_id, deadline)
+        items = [r.format() for r in items]
+        progress(related_done=True)
+        if emit:
+            emit("related", {"RelatedItems": items})
+        return items
+
+    async def score(reviews: ReviewBatch) -> ReviewStats:
+        await score_all_reviews(reviews)
+        progress(ml_done=True)
+        stats = ReviewStats()
+        stats.add_scores(reviews)
+        return stats
+
+    async def summarise(reviews: ReviewBatch, stats: ReviewStats) -> str:
+        return await summarizer.summarize(reviews)
+
+    async def publish_summary(summary: str, stats: ReviewStats) -> None:
+        progress(summary_done=True)
+        if emit:
+            emit("summary", {"Summary": summary, **stats.format()})
+
+    pipeline = Pipeline([
+        Stage("related", find_related, timeout=RELATED_STAGE_TIMEOUT, fallback=[]),
+        Stage("reviews", partial(get_processed_reviews, url, progress, emit)),
+        Stage("stats", score, deps=("reviews",)),
+        Stage("summary", summarise, deps=("reviews", "stats"), timeout=SUMMARY_STAGE_TIMEOUT, fallback=""),
+        Stage("summary_done", publish_summary, deps=("summary", "stats")),
+    ])
+    results = await pipeline.run()
+    reviews = results["reviews"]
+
+    return_data = {
+        "Reviews" : reviews.format(),
+        "Summary" : results["summary"],
+        **results["stats"].format(),
+        "RelatedItems": results["related"],
+    }
+    timings = pipeline.format_timings()
+    logger.info(f"[ITEM={url_id}]: Stage timings {timings}")
+    for name, timing in pipeline.timings.items():
+        stage_seconds.observe(timing.duration, stage=f"analysis_{name}")
+        record_timing(name, timing.duration)
+    reviews_per_request.observe(len(reviews))
+    analyses.inc(outcome="ok" if reviews else "empty")
+
+    # If scraping failed or returned nothing, answer without caching the result
     if not reviews:
         logger.warning(f"No reviews scraped for {url_id!r}; returning empty result.")
-        return {
-            "Reviews": [],
-            "Summary": "",
-            "ReviewsScraped": 0,
-            "SentimentScore": 0,
-            "UserSentiment": "neutral",
-            "FakeRatio": 0,
-            "RelatedItems": [],
-        }
-
-    mean_final_score = sum(r.final for r in reviews) / len(reviews)
-    mean_sentiment_score = sum(r.score['sent'] for r in reviews) / len(reviews)
-    mean_fake_score = sum(r.score['plag'] > 0.5 for r in reviews) / len(reviews)
-    user_sentiment = get_sentiment_text(mean_final_score)
-
-    summary = get_llm_summary(reviews[:LLM_REVIEW_COUNT])
-    summary = clean_text(summary)
-
-    similar_items = get_similar_items_from_amazon(url_id)
-
-    return_data = { 
-        "Reviews" : [r.format() for r in reviews],
-        "Summary" : summary,
-        "ReviewsScraped": len(reviews),
-        "SentimentScore" : (round(mean_sentiment_score * 100)),
-        "UserSentiment": user_sentiment,
-        "FakeRatio": round(mean_fake_score * 100),
-        "RelatedItems": [r.format() for r in similar_items],
-    }
+        return {**return_data, "Timings": timings}
+
+    # the timings belong to this scrape only, cache hits do not report them
+    await response_cache.set(url_id, return_data)
+    return {**return_data, "Timings": timings}
 
-    # Save to cache only if Redis is available
-    if redis:
-        try:
-            redis.set(url_id, return_data)
-            logger.info(f"Dumped data to redis for {url_id!r}")
-        except Exception as e:
-            logger.warning(f"Redis set failed: {e}")
-    
-    return return_data
 
+async def get_processed_reviews(url: str, progress, emit=None):
+    loop = asyncio.get_running_loop()
+    url_id = get_uuid(url)
+    pages = asyncio.Queue()
+    scraped_pages = {}
+    page_batches = {}
+
+    def on_page(page: int, page_reviews: list[FlipkartReview]):
+        loop.call_soon_threadsafe(pages.put_nowait, (page, page_reviews))
 
-def get_processed_reviews(url: str):
-    reviews = scrape_reviews(url)
+    # products scraped before only need their changed pages scraped again
+    if stored_pages := await review_store.load(url_id):
+        scrape_job = partial(refresh_reviews, url, stored_pages, on_page)
+    else:
+        scrape_job = partial(scrape_reviews, url, on_page)
+    scrape = asyncio.ensure_future(run_blocking(scrape_executor, scrape_job))
+    scrape.add_done_callback(lambda _: pages.put_nowait(None))
+
+    # pages are scored as they arrive when streaming, using the aggregates so far
+    running = ReviewStats()
+    pages_scraped = reviews_scraped = 0
+    while (item := await pages.get()) is not None:
+        page, page_reviews = item
+        if page_reviews:
+            scraped_pages[page] = page_reviews
+            page_batches[page] = ReviewBatch.from_reviews(page_reviews)
+        pages_scraped += 1
+        reviews_scraped += len(page_reviews)
+        progress(pages_scraped=pages_scraped, reviews_scraped=reviews_scraped)
+
+        if emit and page_reviews:
+            batch = page_batches[page]
+            running.add_votes(batch)
+            score_reviews(batch, running.overall_ldr)
+            await add_model_scores(batch)
+            set_final_scores(batch)
+            running.add_scores(batch)
+            emit("page", {"page": page, "Reviews": batch.format(), **running.format()})
+
+    await scrape
+    await review_store.save(url_id, scraped_pages)
+    # the scrapers return exactly the reviews they passed to on_page, in page order,
+    # so the page batches keep the model scores given to them while streaming
+    return ReviewBatch.concat([page_batches[page] for page in sorted(page_batches)])
+
+
+async def score_all_reviews(reviews: ReviewBatch) -> None:
     score_reviews(reviews)
+    await add_model_scores(reviews, np.flatnonzero(np.isnan(reviews.scores["sent"])))
+    set_final_scores(reviews)
 
+
+# `rows` picks the reviews to score, all of them by default
+async def add_model_scores(reviews: ReviewBatch, rows: np.ndarray = None) -> None:
+    if rows is None:
+        rows = np.arange(len(reviews))
     # Run ML only on reviews that have text; align results back by index
-    text_indices = [i for i, r in enumerate(reviews) if r.text and r.text.strip()]
-    review_texts = [reviews[i].text for i in text_indices]
+    text_rows = [i for i in rows.tolist() if reviews.text[i] and reviews.text[i].strip()]
+    review_texts = [reviews.text[i] for i in text_rows]
     
-    # Only run ML models if we have valid text reviews
-    if review_texts:
-        sentiment_scores = get_sentiment_scores(review_texts)
-        verifier_scores = get_verifier_scores(review_texts)
-    else:
-        sentiment_scores = []
-        verifier_scores = []
+    # Only run ML models on texts that were never scored before
+    cached = await score_cache.get_many(review_texts)
+    missing_texts = list(dict.fromkeys(
+        text for text, scores in zip(review_texts, cached) if scores is None
+    ))
+    if missing_texts:
+        sentiment_scores, verifier_scores = await asyncio.wrap_future(
+            inference.submit(missing_texts)
+        )
+        new_scores = list(zip(sentiment_scores, verifier_scores))
+        await score_cache.set_many(missing_texts, new_scores)
+        computed = dict(zip(missing_texts, new_scores))
+        cached = [scores or computed[text] for text, scores in zip(review_texts, cached)]
+    elif not review_texts and len(rows):
         logger.warning("No valid review texts found for ML processing")
 
+    # Reviews without text keep 0.0
+    reviews.scores["sent"][rows] = 0.0
+    reviews.scores["plag"][rows] = 0.0
+    if text_rows:
+        model_scores = np.array(cached, dtype=np.float64)
+        reviews.scores["sent"][text_rows] = model_scores[:, 0]
+        reviews.scores["plag"][text_rows] = model_scores[:, 1]
+
+
+def set_final_scores(reviews: ReviewBatch) -> None:
     grads = {
         "ldr": 0.0829,
         "eng": 0.4726,
@@ -136,36 +542,10 @@ def get_processed_reviews(url: str):
         "plag": 0.4035,
     }
 
-    # Initialize defaults
-    for r in reviews:
-        r.score.setdefault('sent', 0.0)
-        r.score.setdefault('plag', 0.0)
-
-    # Assign scores to the corresponding reviews with text
-    for idx, sentiment, plagarism in zip(text_indices, sentiment_scores, verifier_scores):
-        reviews[idx].score['sent'] = float(sentiment)
-        reviews[idx].score['plag'] = float(plagarism)
-
-    for review in reviews:
-        review.final = sum(grads[k] * review.score[k] for k in grads)
-        review.final = min(review.final, 1.0)
-
-    return reviews
-
-
-def get_llm_summary(reviews: list[FlipkartReview]) -> str:
-    text_list = [r.text for r in reviews]
-    llm_prompt = (
-        "You are given a list of user reviews. Read them all carefully and generate a concise, balanced summary that captures the overall sentiment, common themes, notable pros and cons, and any frequently mentioned issues or praises. Use clear language and aim to reflect the general consensus as well as any strong outliers. DO NOT USE POINTS. "
-        f"GIVE ME A 150 WORD REVIEW: {text_list}"
-    )
-    try:
-        response = llm_model.generate_content(llm_prompt).text
-        logger.info(f"Generated llm response of size = {len(response)}")
-        return response
-    except Exception as err:
-        logger.error(f"Encountered error while generating llm summary | ERROR: {err}")
-        return ''
+    final = np.zeros(len(reviews))
+    for key, grad in grads.items():
+        final += grad * reviews.scores[key]
+    reviews.final = np.minimum(final, 1.0)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,192 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from bisect import bisect_left
+import threading
+import time
+
+
+# Prometheus text format without a client library. Everything lives in one process
+# wide registry; with several api workers every worker serves its own numbers.
+
+# seconds, from a redis round trip up to a cold scrape
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+REVIEW_BUCKETS = (0, 10, 50, 100, 200, 500, 1000, 2500)
+
+
+def _format_labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{str(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(labels[name] for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for key, value in values.items():
+            yield self.name + _format_labels(self.labels, key), value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = (), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        # per label set: counts per bucket (the last one is +Inf), sum
+        self._values: dict[tuple, tuple[list[int], list[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(labels[name] for name in self.labels)
+        with self._lock:
+            counts, total = self._values.setdefault(
+                key, ([0] * (len(self.buckets) + 1), [0.0])
+            )
+            counts[bisect_left(self.buckets, value)] += 1
+            total[0] += value
+
+    def samples(self):
+        with self._lock:
+            values = {key: (list(counts), total[0]) for key, (counts, total) in self._values.items()}
+        for key, (counts, total) in values.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                yield self.name + "_bucket" + _format_labels(self.labels, key, f'le="{bound}"'), cumulative
+            yield self.name + "_sum" + _format_labels(self.labels, key), total
+            yield self.name + "_count" + _format_labels(self.labels, key), cumulative
+
+
+# Read when /metrics is scraped: `collect` returns a number, or a dict from label
+# value tuples to numbers, taken from the stats of the object it watches. Counters
+# those objects keep themselves are exposed with kind "counter".
+class Gauge:
+    def __init__(self, name: str, help: str, collect, labels: tuple[str, ...] = (), kind="gauge"):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.collect = collect
+        self.kind = kind
+
+    def samples(self):
+        values = self.collect()
+        if not isinstance(values, dict):
+            values = {(): values}
+        for key, value in values.items():
+            if value is not None:
+                yield self.name + _format_labels(self.labels, key), value
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for sample, value in metric.samples():
+                lines.append(f"{sample} {float(value)!r}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+stage_seconds = registry.register(Histogram(
+    "revscan_stage_seconds", "Time spent in each stage of an analysis.", ("stage",)
+))
+redis_seconds = registry.register(Histogram(
+    "revscan_redis_seconds", "Redis round trips by command.", ("op",)
+))
+redis_errors = registry.register(Counter(
+    "revscan_redis_errors_total", "Redis commands that raised.", ("op",)
+))
+reviews_per_request = registry.register(Histogram(
+    "revscan_reviews_per_request", "Reviews scraped for an analysis.", buckets=REVIEW_BUCKETS
+))
+analyses = registry.register(Counter(
+    "revscan_analyses_total", "Finished analyses by outcome.", ("outcome",)
+))
+
+# the Server-Timing entries of the request being served, set by the api middleware.
+# Worker threads run in copies of the request's context and add to the same dict.
+request_timings: ContextVar[dict[str, float] | None] = ContextVar("request_timings", default=None)
+_timings_lock = threading.Lock()
+
+
+def record_timing(name: str, seconds: float) -> None:
+    add_timings(request_timings.get(), {name: seconds})
+
+
+def add_timings(into: dict[str, float] | None, timings: dict[str, float]) -> None:
+    if into is None:
+        return
+    with _timings_lock:
+        for name, seconds in timings.items():
+            into[name] = into.get(name, 0.0) + seconds
+
+
+@contextmanager
+def timed(stage: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        stage_seconds.observe(elapsed, stage=stage)
+        record_timing(stage, elapsed)
+
+
+def server_timing_header(timings: dict[str, float]) -> str:
+    return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items())
+
+
+# Wraps the async redis client so every command is timed and counted, the
+# callers keep their own error handling.
+class TimedRedis:
+    TIMED = frozenset({"get", "set", "mget", "exists", "delete", "eval"})
+
+    def __init__(self, redis):
+        self._redis = redis
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._redis, name)
+        if name not in self.TIMED:
+            return attr
+
+        async def timed_command(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await attr(*args, **kwargs)
+            except Exception:
+                redis_errors.inc(op=name)
+                raise
+            finally:
+                elapsed = time.perf_counter() - started
+                redis_seconds.observe(elapsed, op=name)
+                record_timing("redis", elapsed)
+
+        return timed_command
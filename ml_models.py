@@ -1,66 +1,274 @@
 
 from utils import make_logger
+from metrics import timed
+from constants import MODEL_MAX_BATCH_TOKENS, MODEL_MAX_SEQ_LEN, MODEL_MODE, TORCH_NUM_THREADS
 import torch
-from torch.nn.utils.rnn import pad_sequence
+from torch import nn
 import nltk
-nltk.download("punkt")
-nltk.download("punkt_tab")
-from nltk.tokenize import word_tokenize
+from nltk.tokenize import sent_tokenize, NLTKWordTokenizer
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+import contextvars
+import numpy as np
 import json
+import re
 
 
 logger = make_logger("ml-model")
 
+try:
+    nltk.data.find("tokenizers/punkt_tab/english/")
+except LookupError:
+    # the docker image bundles it at build time, see docker/Dockerfile
+    logger.warning("punkt_tab not found in NLTK_DATA, downloading it")
+    nltk.download("punkt_tab", quiet=True)
 
-sentiment_model = torch.jit.load("ml-models/sentiment-analysis.pt", map_location="cpu")
-logger.info(f"Loaded sentiment model")
-verifier_model = torch.jit.load("ml-models/check-fake.pt", map_location="cpu") 
-logger.info(f"Loaded verifier model")
+if TORCH_NUM_THREADS:
+    torch.set_num_threads(TORCH_NUM_THREADS)
+
+
+# Eager copy of the network both TorchScript files hold, needed for dynamic
+# quantization which does not work on scripted modules. Sizes come from the weights.
+class ClassifierModel(nn.Module):
+    def __init__(self, vocab_size: int, embed_dim: int, channels: int, hidden: int):
+        super().__init__()
+        self.embed = nn.Embedding(vocab_size, embed_dim)
+        self.conv1 = nn.Conv1d(embed_dim, channels, 3, padding=1)
+        self.pool1 = nn.MaxPool1d(2)
+        self.conv2 = nn.Conv1d(channels, channels, 3, padding=1)
+        self.pool2 = nn.MaxPool1d(2)
+        self.conv3 = nn.Conv1d(channels, channels, 3, padding=1)
+        self.globpool = nn.AdaptiveMaxPool1d(1)
+        self.fc1 = nn.Linear(channels, hidden)
+        self.fc2 = nn.Linear(hidden, 1)
+
+    @classmethod
+    def from_scripted(cls, scripted) -> "ClassifierModel":
+        weights = scripted.state_dict()
+        model = cls(
+            *weights["embed.weight"].shape,
+            weights["conv1.weight"].shape[0],
+            weights["fc1.weight"].shape[0],
+        )
+        model.load_state_dict(weights)
+        return model.eval()
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        x = torch.transpose(self.embed(x), 1, 2)
+        x = self.pool1(torch.relu(self.conv1(x)))
+        x = self.pool2(torch.relu(self.conv2(x)))
+        x = torch.relu(self.conv3(x))
+        x = torch.squeeze(self.globpool(x), 2)
+        x = torch.relu(self.fc1(x))
+        return torch.squeeze(torch.sigmoid(self.fc2(x)), 1)
+
+
+def _load_model(path: str):
+    model = torch.jit.load(path, map_location="cpu").eval()
+    if MODEL_MODE == "optimized":
+        model = torch.jit.optimize_for_inference(torch.jit.freeze(model))
+    elif MODEL_MODE == "int8":
+        # fc1 and fc2 are the only linear layers and there are no recurrent ones,
+        # the embedding and convolutions stay in fp32
+        quantized = torch.ao.quantization.quantize_dynamic(
+            ClassifierModel.from_scripted(model), {nn.Linear}, dtype=torch.qint8
+        )
+        model = torch.jit.freeze(torch.jit.script(quantized).eval())
+    return model
+
+
+sentiment_model = _load_model("ml-models/sentiment-analysis.pt")
+logger.info(f"Loaded sentiment model [MODE={MODEL_MODE}]")
+verifier_model = _load_model("ml-models/check-fake.pt")
+logger.info(f"Loaded verifier model [MODE={MODEL_MODE}]")
+_models = {"sentiment": sentiment_model, "verifier": verifier_model}
 vocab = json.load(open("ml-models/vocab.json"))
 logger.info(f"Loaded model vocabulary: {len(vocab)} words")
 
 
+# words outside the vocabulary get id 1, a miss is the only lookup that runs python code
+class _Vocabulary(dict):
+    def __missing__(self, token: str) -> int:
+        return 1
+
+
+_token_id = _Vocabulary(vocab).__getitem__
+
+
+# lets both models run on the same batch at the same time
+_model_executor = ThreadPoolExecutor(2, thread_name_prefix="model")
+
+# the convolution and pooling layers need at least this many tokens
+MIN_SEQ_LEN = 4
+
+# word_tokenize runs punkt and then ~30 regex substitutions over every sentence.
+# The same substitutions are replayed here in nltk's order, but each only when
+# the text holds a character it can match, plain reviews only need three of them.
+_NLTK = NLTKWordTokenizer
+_SENTENCE_RULES = [
+    ("«“‘„`", *_NLTK.STARTING_QUOTES[0]),
+    ('"', *_NLTK.STARTING_QUOTES[1]),
+    ('"`', *_NLTK.STARTING_QUOTES[2]),
+    ("\"'", *_NLTK.STARTING_QUOTES[3]),
+    ("'", *_NLTK.STARTING_QUOTES[4]),
+    (".", *_NLTK.PUNCTUATION[0]),
+    (":,", *_NLTK.PUNCTUATION[1]),
+    (":,", *_NLTK.PUNCTUATION[2]),
+    (".", *_NLTK.PUNCTUATION[3]),
+    (";@#$%&", *_NLTK.PUNCTUATION[4]),
+    (".", *_NLTK.PUNCTUATION[5]),
+    ("?!", *_NLTK.PUNCTUATION[6]),
+    ("'", *_NLTK.PUNCTUATION[7]),
+    ("*", *_NLTK.PUNCTUATION[8]),
+    ("[](){}<>", *_NLTK.PARENS_BRACKETS),
+    ("-", *_NLTK.DOUBLE_DASHES),
+]
+# these run on the text padded with spaces, only the quote rules depend on how
+# whitespace looks so the \s+ squeeze is left to str.split() otherwise
+_PADDED_RULES = [
+    ("»”’", *_NLTK.ENDING_QUOTES[0]),
+    ("'", *_NLTK.ENDING_QUOTES[1]),
+    ('"', *_NLTK.ENDING_QUOTES[2]),
+    # the rule above turns " into ''
+    ("'\"", *_NLTK.ENDING_QUOTES[3]),
+    ("'\"", *_NLTK.ENDING_QUOTES[4]),
+    ("'\"", *_NLTK.ENDING_QUOTES[5]),
+]
+_SENTENCE_RULES, _PADDED_RULES = (
+    [(frozenset(chars), regexp, substitution) for chars, regexp, substitution in rules]
+    for rules in (_SENTENCE_RULES, _PADDED_RULES)
+)
+# the rules are picked by position, an nltk release that adds or reorders them
+# has to be checked with tests/test_tokenizer.py and the guards above updated
+_NLTK_RULE_COUNTS = {
+    "STARTING_QUOTES": 5, "PUNCTUATION": 9, "ENDING_QUOTES": 6, "CONTRACTIONS2": 8, "CONTRACTIONS3": 2,
+}
+if changed := {
+    name: len(getattr(_NLTK, name))
+    for name, count in _NLTK_RULE_COUNTS.items()
+    if len(getattr(_NLTK, name)) != count
+}:
+    raise RuntimeError(f"NLTK's tokenizer rules changed {changed}, the fast tokenizer is out of date")
+# CONTRACTIONS2 in one pass, the words they split never overlap
+_CONTRACTIONS = re.compile(
+    r"(?i)\b(?:(can)(not)|(d)('ye)|(gim)(me)|(gon)(na)|(got)(ta)|(lem)(me)|(more)('n))\b"
+    r"|\b(wan)(na)(?=\s)"
+)
+
+
+def get_scores(text_list: list[str]) -> tuple[list[float], list[float]]:
+    # tokenizes the batch once and feeds it to both models, returns (sentiment, verifier)
+    sentiment, verifier = _score_texts(("sentiment", "verifier"), text_list)
+    return sentiment, verifier
+
+
 def get_sentiment_scores(text_list: list[str]) -> list[float]:
-    return _use_model(sentiment_model, text_list)
+    return _score_texts(("sentiment",), text_list)[0]
 
 
 def get_verifier_scores(text_list: list[str]) -> list[float]:
-    return _use_model(verifier_model, text_list)
-
-
-def _use_model(model, text_list: list[str]):
-    # Guard against empty input
-    if not text_list:
-        return []
-    tensors = _batch_tensors(text_list)
-    model.eval()
-    with torch.no_grad():
-        return model(tensors).numpy().tolist()
-
-
-def _encode_text(text):
-    return torch.tensor([
-        vocab.get(tk, 1)
-        for tk in word_tokenize(text)
-    ])
-
-
-def _batch_tensors(reviews):
-    # Guard against empty input
-    if not reviews:
-        return torch.tensor([])
-    
-    # Filter out empty reviews
-    valid_reviews = [text for text in reviews if text and text.strip()]
-    if not valid_reviews:
-        return torch.tensor([])
-    
-    batched_tensors = pad_sequence([
-        _encode_text(text)
-        for text in valid_reviews
-    ], batch_first=True)
-
-    return batched_tensors
+    return _score_texts(("verifier",), text_list)[0]
+
+
+def _score_texts(models: tuple[str, ...], text_list: list[str]) -> list[list[float]]:
+    # empty texts are not run through the models and keep a score of 0.0
+    scores = [[0.0] * len(text_list) for _ in models]
+    indices = [i for i, text in enumerate(text_list) if text and text.strip()]
+    ids, starts, lengths = _encode_texts([text_list[i] for i in indices])
+
+    for batch in _iter_batches(lengths):
+        tensors = _batch_tensors(ids, starts[batch], lengths[batch])
+        futures = [
+            _model_executor.submit(contextvars.copy_context().run, _run_model, name, tensors)
+            for name in models
+        ]
+        for model_scores, future in zip(scores, futures):
+            for j, score in zip(batch, future.result()):
+                model_scores[indices[j]] = score
+
+    return scores
+
+
+def _run_model(name: str, tensors) -> list[float]:
+    # grad mode is per thread, so it is switched off where the model runs
+    with timed(f"model_{name}"), torch.no_grad():
+        return _models[name](tensors).numpy().tolist()
+
+
+def _tokenize(text: str) -> list[str]:
+    # gives the same token ids as word_tokenize(text)
+    body = text.rstrip()
+    if "." in body[:-1]:
+        # punkt is only needed where a period may end a sentence, splitting at
+        # ? and ! moves no token boundary and the rules split off a final period
+        return [token for sent in sent_tokenize(text) for token in _tokenize_sentence(sent)]
+    return _tokenize_sentence(text)
+
+
+def _tokenize_sentence(text: str) -> list[str]:
+    # the guards are checked against the characters the text started with, which
+    # holds as long as no rule brings in a character a later guard looks for
+    present = set(text)
+    for chars, regexp, substitution in _SENTENCE_RULES:
+        if not chars.isdisjoint(present):
+            text = regexp.sub(substitution, text)
+
+    text = f" {text} "
+    present = set(text)
+    for chars, regexp, substitution in _PADDED_RULES:
+        if not chars.isdisjoint(present):
+            text = regexp.sub(substitution, text)
+
+    text = _CONTRACTIONS.sub(_split_contraction, text)
+    if "'" in text:
+        for regexp in _NLTK.CONTRACTIONS3:
+            text = regexp.sub(r" \1 \2 ", text)
+    return text.split()
+
+
+def _split_contraction(match: re.Match) -> str:
+    return " " + " ".join(part for part in match.groups() if part) + " "
+
+
+@timed("tokenize")
+def _encode_texts(text_list: list[str]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # token ids of the whole batch back to back in one int64 buffer,
+    # text i owns ids[starts[i]:starts[i] + lengths[i]]
+    token_lists = [_tokenize(text)[:MODEL_MAX_SEQ_LEN or None] for text in text_list]
+    lengths = np.fromiter(map(len, token_lists), dtype=np.int64, count=len(token_lists))
+    ids = np.fromiter(
+        map(_token_id, chain.from_iterable(token_lists)),
+        dtype=np.int64,
+        count=int(lengths.sum()),
+    )
+    starts = np.zeros_like(lengths)
+    np.cumsum(lengths[:-1], out=starts[1:])
+    return ids, starts, lengths
+
+
+def _iter_batches(lengths: np.ndarray):
+    # groups texts of similar length so that little padding is needed, a group is
+    # closed once its padded size would go over MODEL_MAX_BATCH_TOKENS
+    order = np.argsort(lengths, kind="stable").tolist()
+    batch = []
+    for i in order:
+        length = max(int(lengths[i]), MIN_SEQ_LEN)
+        if batch and (len(batch) + 1) * length > MODEL_MAX_BATCH_TOKENS:
+            yield batch
+            batch = []
+        batch.append(i)
+    if batch:
+        yield batch
+
+
+def _batch_tensors(ids: np.ndarray, starts: np.ndarray, lengths: np.ndarray) -> torch.Tensor:
+    # gathers the rows straight out of the shared buffer, padding positions stay 0
+    width = max(int(lengths.max()), MIN_SEQ_LEN)
+    positions = np.arange(width)
+    mask = positions < lengths[:, None]
+    rows = np.zeros((len(lengths), width), dtype=np.int64)
+    rows[mask] = ids[(starts[:, None] + positions)[mask]]
+    return torch.from_numpy(rows)
 
 
 if __name__ == "__main__":
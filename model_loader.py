@@ -0,0 +1,99 @@
+from utils import *
+from importlib import import_module
+import threading
+import time
+
+
+logger = make_logger("model-loader")
+
+# short and long reviews so the warm-up covers a few batch shapes
+WARMUP_TEXTS = [
+    "good",
+    "nice product, worth the price",
+    "the quality is great and delivery was quick, would buy again",
+    "stopped working after a week. the seller did not reply and the replacement took"
+    " a month to arrive, not worth the money at all, do not buy this product",
+] * 4
+
+
+def _get_model_version(*paths: str) -> str:
+    # changes whenever a model or the vocabulary is replaced, used to key cached scores
+    digest = hashlib.sha1()
+    for path in paths:
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+
+# optimized and quantized models score slightly differently, and the truncation
+# length decides which part of a long review is scored
+MODEL_VERSION = "-".join((
+    _get_model_version(
+        "ml-models/sentiment-analysis.pt", "ml-models/check-fake.pt", "ml-models/vocab.json"
+    ),
+    MODEL_MODE,
+    f"len{MODEL_MAX_SEQ_LEN or 'full'}",
+))
+
+
+# Imports ml_models (torch, nltk and both TorchScript models) off the app's import
+# path, either from a background thread at startup or on first use. A warm-up
+# pass follows so the first real request does not pay for TorchScript profiling.
+class ModelLoader:
+    def __init__(self, warmup_runs: int):
+        self.warmup_runs = warmup_runs
+        self.error = None
+        self.timings = {}
+        self.ready_at = None
+        self._models = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self._models is not None
+
+    def start(self) -> None:
+        threading.Thread(target=self._load_in_background, name="model-loader", daemon=True).start()
+
+    def load(self):
+        if self._models is None:
+            with self._lock:
+                if self._models is None:
+                    self._models = self._load()
+        return self._models
+
+    def get_scores(self, text_list: list[str]) -> tuple[list[float], list[float]]:
+        return self.load().get_scores(text_list)
+
+    def status(self) -> dict[str]:
+        return {"ready": self.ready, "error": self.error, "timings": self.timings}
+
+    def _load(self):
+        started = time.perf_counter()
+        try:
+            models = import_module("ml_models")
+            imported = time.perf_counter()
+            for _ in range(self.warmup_runs):
+                models.get_scores(WARMUP_TEXTS)
+        except Exception as e:
+            self.error = str(e)
+            raise
+        finished = time.perf_counter()
+
+        self.error = None
+        self.ready_at = finished
+        self.timings = {
+            "import": round(imported - started, 3),
+            "warmup": round(finished - imported, 3),
+        }
+        logger.info(
+            f"Models ready in {finished - started:.2f}s"
+            f" [IMPORT={imported - started:.2f}s] [WARMUP={finished - imported:.2f}s]"
+        )
+        return models
+
+    def _load_in_background(self) -> None:
+        try:
+            self.load()
+        except Exception as e:
+            logger.error(f"Failed to load models, retrying on first use | ERROR: {e}")
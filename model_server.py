@@ -0,0 +1,167 @@
+from utils import *
+from model_loader import ModelLoader
+from inference import InferenceScheduler
+import threading
+import socket
+import struct
+import json
+import time
+import os
+
+
+logger = make_logger("model-server")
+
+# every message is a 4 byte big endian length followed by that much json
+_HEADER = struct.Struct(">I")
+
+
+def _frame(message: dict) -> bytes:
+    body = json.dumps(message, separators=(",", ":")).encode()
+    return _HEADER.pack(len(body)) + body
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> bytes:
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("model server closed the connection")
+        data += chunk
+    return bytes(data)
+
+
+def _recv_frame(sock: socket.socket) -> dict:
+    (size,) = _HEADER.unpack(_recv_exactly(sock, _HEADER.size))
+    return json.loads(_recv_exactly(sock, size))
+
+
+# Holds the only copy of the models on a host. API workers connect over a unix
+# socket and their batches go through one InferenceScheduler, so requests of
+# different workers are scored together and torch threads are not oversubscribed.
+class ModelServer:
+    def __init__(self, path: str):
+        self.path = path
+        self.loader = ModelLoader(MODEL_WARMUP_RUNS)
+        self.inference = InferenceScheduler(
+            self.loader.get_scores, INFERENCE_MAX_BATCH, INFERENCE_MAX_WAIT
+        )
+
+    async def serve(self) -> None:
+        self.loader.start()
+        self.inference.start()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        server = await asyncio.start_unix_server(self._handle, path=self.path)
+        logger.info(f"Serving models on {self.path}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.inference.stop()
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    header = await reader.readexactly(_HEADER.size)
+                except asyncio.IncompleteReadError:
+                    break
+                (size,) = _HEADER.unpack(header)
+                request = json.loads(await reader.readexactly(size))
+                writer.write(_frame(await self._respond(request)))
+                await writer.drain()
+        except Exception as e:
+            logger.warning(f"Dropping model client connection | ERROR: {e}")
+        finally:
+            writer.close()
+
+    async def _respond(self, request: dict) -> dict:
+        try:
+            if request["op"] == "score":
+                future = self.inference.submit(request["texts"])
+                sentiment, verifier = await asyncio.wrap_future(future)
+                return {"ok": True, "result": {"sentiment": sentiment, "verifier": verifier}}
+            if request["op"] == "status":
+                status = {**self.loader.status(), "inference": self.inference.stats()}
+                return {"ok": True, "result": status}
+            return {"ok": False, "error": f"unknown op {request['op']!r}"}
+        except Exception as e:
+            return {"ok": False, "error": str(e)}
+
+
+# Stands in for ModelLoader inside API workers when MODEL_SERVING is "sidecar",
+# torch and the models are never imported by the worker itself.
+class ModelClient:
+    def __init__(self, path: str, timeout: float):
+        self.path = path
+        self.timeout = timeout
+        self.ready_at = None
+        self._sock = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        # the server loads the models, there is nothing to do in the worker
+        pass
+
+    def load(self) -> None:
+        # waits until the server reports its models as ready
+        deadline = time.monotonic() + self.timeout
+        while not self.status()["ready"]:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"model server at {self.path} did not get ready")
+            time.sleep(0.5)
+
+    def get_scores(self, text_list: list[str]) -> tuple[list[float], list[float]]:
+        with self._lock:
+            result = self._call({"op": "score", "texts": text_list})
+        return result["sentiment"], result["verifier"]
+
+    def status(self) -> dict[str]:
+        # asked on its own connection so a readiness probe never queues behind a batch
+        try:
+            with self._connect() as sock:
+                sock.sendall(_frame({"op": "status"}))
+                status = self._unwrap(_recv_frame(sock))
+        except OSError as e:
+            return {"ready": False, "error": f"model server unreachable: {e}", "timings": {}}
+        if status["ready"] and self.ready_at is None:
+            self.ready_at = time.perf_counter()
+        return status
+
+    def _call(self, request: dict) -> dict:
+        # a broken connection, e.g. after a server restart, is replaced once
+        for attempt in range(2):
+            try:
+                if self._sock is None:
+                    self._sock = self._connect()
+                self._sock.sendall(_frame(request))
+                return self._unwrap(_recv_frame(self._sock))
+            except OSError as e:
+                if self._sock:
+                    self._sock.close()
+                    self._sock = None
+                # a timed out batch is not sent a second time
+                if attempt or isinstance(e, TimeoutError):
+                    raise
+
+    def _connect(self) -> socket.socket:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.path)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    @staticmethod
+    def _unwrap(response: dict) -> dict:
+        if not response["ok"]:
+            raise RuntimeError(f"model server: {response['error']}")
+        return response["result"]
+
+
+if __name__ == "__main__":
+    asyncio.run(ModelServer(MODEL_SERVER_SOCKET).serve())
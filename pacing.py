@@ -0,0 +1,52 @@
+from utils import *
+from urllib.parse import urlsplit
+import threading
+import time
+
+
+# Classic token bucket: `rate` tokens per second, at most `burst` saved up.
+# `acquire` blocks the calling thread until a token is available.
+class TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+# one token bucket per host, so requests to different sites do not slow each other down
+class HostPacer:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._buckets: dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url: str) -> float:
+        host = urlsplit(url).netloc
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._buckets[host] = TokenBucket(self.rate, self.burst)
+        return bucket.acquire()
+
+
+# courtesy delays towards the scraped sites, every http fetch and every browser
+# navigation waits for a token of its host
+http_pacer = HostPacer(FETCH_RATE_PER_HOST, FETCH_BURST_PER_HOST)
+browser_pacer = HostPacer(BROWSER_RATE_PER_HOST, BROWSER_BURST_PER_HOST)
@@ -0,0 +1,99 @@
+from utils import *
+import threading
+import heapq
+import time
+
+
+logger = make_logger("page-queue")
+
+
+# The review pages of one product, shared by its scrape threads. Each thread takes
+# the lowest page that is due, so a slow page only holds up its own thread. Failed
+# pages go back on the queue after `retry_delay` seconds instead of blocking their
+# thread. Once `max_empty` pages came back empty the lowest of them is taken as the
+# end of the reviews and every queued page after it is dropped for all threads.
+# Pages that ran out of attempts are reported with `fail` and never mark the end.
+class PageQueue:
+    def __init__(self, pages, max_attempts: int, max_empty: int, retry_delay: float):
+        self.max_attempts = max_attempts
+        self.max_empty = max_empty
+        self.retry_delay = retry_delay
+        # (due, page, attempt), fresh pages are due at once and come out in order
+        self._queue = [(0.0, page, 0) for page in pages]
+        heapq.heapify(self._queue)
+        self._results: dict[int, list[FlipkartReview]] = {}
+        self._empty: list[int] = []
+        self._in_flight = 0
+        self._cond = threading.Condition()
+        self.end = None
+        self.counters = {"retried": 0, "failed": 0, "cancelled": 0}
+
+    # next (page, attempt) to scrape, None once nothing is queued or in flight
+    def take(self) -> tuple[int, int] | None:
+        with self._cond:
+            while True:
+                if not self._queue:
+                    # a page in flight may still come back for a retry
+                    if not self._in_flight:
+                        return None
+                    self._cond.wait()
+                    continue
+                due, page, attempt = self._queue[0]
+                if (wait := due - time.monotonic()) > 0:
+                    self._cond.wait(wait)
+                    continue
+                heapq.heappop(self._queue)
+                self._in_flight += 1
+                return page, attempt
+
+    def finish(self, page: int, reviews: list[FlipkartReview]) -> None:
+        with self._cond:
+            self._in_flight -= 1
+            self._results[page] = reviews
+            if not reviews:
+                self._empty.append(page)
+                if len(self._empty) >= self.max_empty:
+                    self._cut(min(self._empty) - 1)
+            self._cond.notify_all()
+
+    # a page that could not be scraped, e.g. while rate limited
+    def fail(self, page: int) -> None:
+        with self._cond:
+            self._in_flight -= 1
+            self.counters["failed"] += 1
+            self._cond.notify_all()
+
+    # puts a failed page back, False once it is out of attempts
+    def retry(self, page: int, attempt: int) -> bool:
+        if attempt + 1 >= self.max_attempts:
+            return False
+        with self._cond:
+            self._in_flight -= 1
+            heapq.heappush(self._queue, (time.monotonic() + self.retry_delay, page, attempt + 1))
+            self.counters["retried"] += 1
+            self._cond.notify_all()
+        return True
+
+    # every scraped review in page order
+    def reviews(self) -> list[FlipkartReview]:
+        with self._cond:
+            return [review for page in sorted(self._results) for review in self._results[page]]
+
+    def stats(self) -> dict[str]:
+        with self._cond:
+            return {
+                **self.counters,
+                "scraped": len(self._results),
+                "empty": len(self._empty),
+                "end": self.end,
+            }
+
+    def _cut(self, end: int) -> None:
+        if self.end is not None and self.end <= end:
+            return
+        self.end = end
+        kept = [item for item in self._queue if item[1] <= end]
+        self.counters["cancelled"] += len(self._queue) - len(kept)
+        heapq.heapify(kept)
+        self._queue = kept
+        logger.info(f"Reviews end after page {end}, dropped the pages queued after it")
@@ -0,0 +1,96 @@
+from utils import *
+from collections.abc import Awaitable, Callable
+import time
+
+
+logger = make_logger("pipeline")
+
+# marks stages whose failure fails the whole pipeline
+NO_FALLBACK = object()
+
+
+# `fn` is a coroutine function called with the results of `deps` as keyword
+# arguments. When it raises or runs over `timeout` seconds the stage resolves to
+# `fallback` instead, stages without a fallback fail the pipeline.
+@dataclass
+class Stage:
+    name: str
+    fn: Callable[..., Awaitable]
+    deps: tuple[str, ...] = ()
+    timeout: float | None = None
+    fallback: object = NO_FALLBACK
+
+
+@dataclass
+class StageTiming:
+    start: float = 0.0
+    duration: float = 0.0
+    status: str = "pending"  # pending -> ok | timeout | failed
+
+    def format(self) -> dict[str]:
+        return {
+            "start": round(self.start, 3),
+            "duration": round(self.duration, 3),
+            "status": self.status,
+        }
+
+
+# Runs a DAG of stages, every stage starts as soon as all of its dependencies are
+# done so independent stages overlap and the total time follows the slowest path.
+class Pipeline:
+    def __init__(self, stages: list[Stage]):
+        self.stages = {stage.name: stage for stage in stages}
+        self.timings = {name: StageTiming() for name in self.stages}
+        for stage in stages:
+            missing = [dep for dep in stage.deps if dep not in self.stages]
+            assert not missing, f"stage {stage.name!r} depends on unknown {missing}"
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._started = 0.0
+
+    async def run(self) -> dict[str]:
+        self._started = time.perf_counter()
+        for name in self.stages:
+            self._task(name)
+        try:
+            results = await asyncio.gather(*self._tasks.values())
+        except BaseException:
+            for task in self._tasks.values():
+                task.cancel()
+            raise
+        return dict(zip(self._tasks, results))
+
+    def format_timings(self) -> dict[str]:
+        timings = {name: timing.format() for name, timing in self.timings.items()}
+        total = max((t.start + t.duration for t in self.timings.values()), default=0.0)
+        return {**timings, "total": round(total, 3)}
+
+    def _task(self, name: str) -> asyncio.Task:
+        if name not in self._tasks:
+            self._tasks[name] = asyncio.create_task(self._run_stage(self.stages[name]))
+        return self._tasks[name]
+
+    async def _run_stage(self, stage: Stage):
+        deps = [self._task(dep) for dep in stage.deps]
+        kwargs = dict(zip(stage.deps, await asyncio.gather(*deps)))
+
+        timing = self.timings[stage.name]
+        started = time.perf_counter()
+        timing.start = started - self._started
+        try:
+            result = await asyncio.wait_for(stage.fn(**kwargs), stage.timeout)
+            timing.status = "ok"
+            return result
+        except asyncio.TimeoutError:
+            timing.status = "timeout"
+            logger.warning(f"[STAGE={stage.name}]: Timed out after {stage.timeout}s")
+            if stage.fallback is NO_FALLBACK:
+                raise
+            return stage.fallback
+        except Exception as err:
+            timing.status = "failed"
+            logger.error(f"[STAGE={stage.name}]: Failed | ERROR: {err}")
+            if stage.fallback is NO_FALLBACK:
+                raise
+            return stage.fallback
+        finally:
+            timing.duration = time.perf_counter() - started
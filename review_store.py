@@ -0,0 +1,41 @@
+from utils import *
+from cache import encode_redis_value, decode_redis_value
+
+
+logger = make_logger("review-store")
+
+
+# Raw scraped reviews of every product, kept page by page in redis so that a
+# refresh only has to scrape the pages that changed (see scraper.refresh_reviews).
+# Pages are stored as {"page": n, "reviews": [...]}.
+class ReviewStore:
+    def __init__(self, redis, ttl: int):
+        self.redis = redis
+        self.ttl = ttl
+
+    async def load(self, url_id: str) -> list[dict] | None:
+        if not self.redis:
+            return None
+        try:
+            if raw := await self.redis.get(f"reviews:{url_id}"):
+                return decode_redis_value(raw)
+        except Exception as e:
+            logger.warning(f"Failed to load stored reviews for {url_id!r}: {e}")
+        return None
+
+    async def save(self, url_id: str, pages: dict[int, list[FlipkartReview]]) -> None:
+        if not self.redis or not pages:
+            return
+        stored = [
+            {
+                "page": page,
+                "reviews": [r.dump() for r in reviews],
+            }
+            for page, reviews in sorted(pages.items())
+        ]
+        try:
+            await self.redis.set(
+                f"reviews:{url_id}", encode_redis_value(stored), ex=self.ttl
+            )
+        except Exception as e:
+            logger.warning(f"Failed to store reviews for {url_id!r}: {e}")
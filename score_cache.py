@@ -0,0 +1,63 @@
+from utils import *
+from cache import LocalCache
+
+
+logger = make_logger("score-cache")
+
+
+# Model scores of review texts, addressed by a hash of the normalised text and the
+# model version, so identical reviews ("Good product", "Nice") across products and
+# refreshes only go through the models once. Optionally persisted in redis so other
+# replicas and restarted workers can reuse them.
+class ScoreCache:
+    def __init__(self, redis, model_version: str, local_size: int, ttl: int, persist: bool):
+        self.redis = redis if persist else None
+        self.model_version = model_version
+        self.ttl = ttl
+        self.local = LocalCache(local_size, ttl)
+        self.counters = {"hit": 0, "miss": 0}
+
+    def key(self, text: str) -> str:
+        normalised = " ".join(text.split())
+        digest = hashlib.sha1(normalised.encode()).hexdigest()
+        return f"score:{self.model_version}:{digest}"
+
+    # returns a (sentiment, verifier) pair or None for every text
+    async def get_many(self, texts: list[str]) -> list[tuple[float, float] | None]:
+        keys = [self.key(text) for text in texts]
+        scores = [self.local.get(key) for key in keys]
+
+        missing = [i for i, score in enumerate(scores) if score is None]
+        if missing and self.redis:
+            try:
+                found = await self.redis.mget(*[keys[i] for i in missing])
+            except Exception as e:
+                logger.warning(f"Redis mget failed: {e}")
+                found = [None] * len(missing)
+            for i, raw in zip(missing, found):
+                if raw:
+                    scores[i] = tuple(map(float, raw.split(",")))
+                    self.local.set(keys[i], scores[i])
+
+        hits = sum(score is not None for score in scores)
+        self.counters["hit"] += hits
+        self.counters["miss"] += len(scores) - hits
+        return scores
+
+    async def set_many(self, texts: list[str], scores: list[tuple[float, float]]) -> None:
+        keys = [self.key(text) for text in texts]
+        for key, score in zip(keys, scores):
+            self.local.set(key, score)
+
+        if not self.redis or not keys:
+            return
+        try:
+            pipeline = self.redis.pipeline()
+            for key, (sent, plag) in zip(keys, scores):
+                pipeline.set(key, f"{sent},{plag}", ex=self.ttl)
+            await pipeline.exec()
+        except Exception as e:
+            logger.warning(f"Redis pipeline set failed: {e}")
+
+    def stats(self) -> dict[str]:
+        return {**self.counters, "local_entries": len(self.local)}
@@ -1,14 +1,42 @@
 from utils import *
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+from driver_pool import driver_pool
+from http_fetcher import fetch_html
+from page_queue import PageQueue
+from pacing import browser_pacer
+from metrics import timed
+import logging
+from governor import governor
+from selectolax.lexbor import LexborHTMLParser
 from concurrent.futures import ThreadPoolExecutor
+from collections import Counter
+from typing import TYPE_CHECKING
 import time
 
-
-def scrape_reviews(url: str) -> list[FlipkartReview]:
-    page_count = get_total_pages(url)
+# selenium is imported by the browser code paths only, pages that come over http
+# and the api startup never load it
+if TYPE_CHECKING:
+    from selenium import webdriver
+
+
+# where the parts of a review live in flipkart's markup
+REVIEW_SELECTORS = {
+    "review": "div.EKFha-",
+    "text": "div.ZmyHeo",
+    "rating": "div.XQDdHH.Ga3i8K",
+    # user and time, the user one also carries `user_class`
+    "meta": "p._2NsDsF",
+    # likes and dislikes, the dislike one also carries `dislike_class`
+    "votes": "div._6kK6mk",
+    "user_class": "AwS1CA",
+    "dislike_class": "aQymJL",
+    # "Page X of N" blocks
+    "pages": "div._1G0WLw.mpIySA",
+}
+
+
+# `on_page(page, reviews)` is called from the worker threads after every page
+def scrape_reviews(url: str, on_page=None) -> list[FlipkartReview]:
+    page_count, first_page = scrape_first_page(url)
     url_id = get_uuid(url)
 
     if page_count == 0:
@@ -17,95 +45,228 @@ def scrape_reviews(url: str) -> list[FlipkartReview]:
     else:
         logger.info(f"[ITEM={url_id}]: {page_count=}")
 
-    page_batches = batch_pages(page_count)
-    logger.info(f"[ITEM={url_id}]: {page_batches=}")
-
-    with ThreadPoolExecutor(NUM_THREADS) as executor:
-        futures = [
-            executor.submit(scrape_multiple_pages, url, start, end, thread_id)
-            for thread_id, (start, end) in enumerate(page_batches)
-        ]
-        all_reviews = [review for future in futures for review in future.result()]
+    page_count = min(page_count, MAX_REVIEW_PAGES)
+    # page 1 usually came with the page count, the rest start right away
+    if first_page is not None and on_page:
+        on_page(1, first_page)
+    first_queued = 1 if first_page is None else 2
+    if first_queued > page_count:
+        return first_page
+    pages = PageQueue(
+        range(first_queued, page_count + 1), PAGE_MAX_ATTEMPTS, MAX_EMPTY_PAGE_COUNT, PAGE_RETRY_DELAY
+    )
+
+    # the governor may hand out fewer threads when browsers or memory run short,
+    # page threads over http only start a browser for the odd fallback page
+    with governor.admit(
+        url_id, driver_pool.idle_count(), uses_browsers=FETCH_MODE != "http"
+    ) as thread_count:
+        thread_count = min(thread_count, page_count - first_queued + 1)
+        with ThreadPoolExecutor(thread_count) as executor:
+            # a context can only be entered by one thread at a time, so each gets a copy
+            futures = [
+                executor.submit(
+                    contextvars.copy_context().run, scrape_queued_pages, url, pages, thread_id, on_page
+                )
+                for thread_id in range(thread_count)
+            ]
+            for future in futures:
+                future.result()
 
-    logger.info(f"[ITEM={url_id}]: Scraped {len(all_reviews)} reviews")
+    all_reviews = (first_page or []) + pages.reviews()
+    logger.info(f"[ITEM={url_id}]: Scraped {len(all_reviews)} reviews | {pages.stats()}")
     return all_reviews
 
 
-def scrape_multiple_pages(
-    url: str, start: int, end: int, thread_id: int
-) -> list[FlipkartReview]:
+# Re-scrapes a product whose reviews were stored before. Pages are walked in order
+# and the walk stops at the first page that ends in an already stored review, as
+# newer reviews come first; the walked reviews then replace their stored copies
+# and go in front of the rest. Walked and stored reviews are matched one for one
+# by fingerprint, so generic reviews that share one are all kept.
+def refresh_reviews(url: str, stored_pages: list[dict], on_page=None) -> list[FlipkartReview]:
+    url_id = get_uuid(url)
+    # fingerprints are taken again, as the ones saved by older versions hashed the time
+    stored = [FlipkartReview.load(raw) for page in stored_pages for raw in page["reviews"]]
+    unmatched = Counter(r.fingerprint() for r in stored)
+
+    walked = []
+    for page in range(1, MAX_REVIEW_PAGES + 1):
+        single_page = PageQueue([page], PAGE_MAX_ATTEMPTS, 1, PAGE_RETRY_DELAY)
+        scrape_queued_pages(url, single_page, thread_id=0)
+        page_reviews = single_page.reviews()
+        walked.extend(page_reviews)
+        if not page_reviews:
+            break
+        matched = False
+        for review in page_reviews:
+            fp = review.fingerprint()
+            matched = unmatched[fp] > 0
+            unmatched[fp] -= matched
+        # a generic new review may match a stored one, only the last one of a page
+        # tells that the older reviews have started
+        if matched:
+            break
+    logger.info(f"[ITEM={url_id}]: Refresh walked {page} pages, {len(walked)} reviews")
+
+    # every walked review stands in for one stored copy with the same fingerprint
+    replaced = Counter(r.fingerprint() for r in walked)
+    merged = list(walked)
+    for review in stored:
+        fp = review.fingerprint()
+        if replaced[fp]:
+            replaced[fp] -= 1
+        else:
+            merged.append(review)
+
+    # the merged reviews are paged again so they are stored and streamed like a full scrape
+    page_size = max(len(page["reviews"]) for page in stored_pages) or 1
+    merged = merged[:MAX_REVIEW_PAGES * page_size]
+    for start in range(0, len(merged), page_size):
+        if on_page:
+            on_page(start // page_size + 1, merged[start:start + page_size])
+
+    logger.info(f"[ITEM={url_id}]: Refreshed to {len(merged)} reviews")
+    return merged
+
+
+# Scrapes pages off `pages` until it runs dry. A page that fails is handed back
+# to the queue, so the thread moves on and the retry may land on another thread.
+def scrape_queued_pages(url: str, pages: PageQueue, thread_id: int, on_page=None) -> None:
     driver = None
-    range_reviews = []
-    empty_page_count = 0
+    broken = False
     url_id = get_uuid(url)
+    # taken off the queue and not handed back yet, the other threads wait for it
+    pending = None
 
     try:
-        driver = make_webdriver()
-        for page in range(start, end + 1):
-            # small backoff between pages
-            time.sleep(0.5)  # Increased from 0.2 to 0.5 for better stability
-
-            # retry each page once if it fails due to transient errors
-            max_page_retries = 2
-            page_reviews = []
-
-            for retry in range(max_page_retries):
+        while (task := pages.take()) is not None:
+            page, attempt = task
+            pending = page
+            # pages that come back complete over plain http never need a browser
+            page_reviews = None
+            if FETCH_MODE == "http" and attempt == 0:
+                page_reviews = scrape_single_page_http(url, page, url_id)
+
+            if page_reviews is None:
                 try:
+                    if driver is None:
+                        driver = driver_pool.acquire(owner=url_id)
                     page_reviews = scrape_single_page(driver, url, page)
-                    break  # Success, exit retry loop
                 except Exception as e:
                     logger.warning(
-                        f"[ITEM={url_id}, PAGE={page}, THREAD={thread_id}]: Error on attempt {retry + 1}: {e}"
+                        f"[ITEM={url_id}, PAGE={page}, THREAD={thread_id}]: Error on attempt {attempt + 1}: {e}"
                     )
-                    if retry < max_page_retries - 1:  # Not the last retry
-                        try:
-                            if driver:
-                                driver.quit()
-                        except:
-                            pass
-                        time.sleep(1)  # Wait before retry
-                        driver = make_webdriver()
-                    else:
-                        logger.error(
-                            f"[ITEM={url_id}, PAGE={page}, THREAD={thread_id}]: Failed after {max_page_retries} attempts"
-                        )
-                        page_reviews = []  # Empty list on failure
-
-            range_reviews.extend(page_reviews)
-            if not page_reviews:
-                empty_page_count += 1
-                logger.info(
-                    f"[ITEM={url_id}, PAGE={page}, THREAD={thread_id}]: Page had no reviews, {empty_page_count=}"
-                )
-                if empty_page_count >= MAX_EMPTY_PAGE_COUNT:
-                    logger.warning(
-                        f"[ITEM={url_id}, THREAD={thread_id}]: Encountered max amount of empty pages"
+                    # the browser may have crashed, let the pool replace it
+                    if driver:
+                        driver_pool.release(driver, broken=True)
+                    driver = None
+                    if pages.retry(page, attempt):
+                        pending = None
+                        continue
+                    logger.error(
+                        f"[ITEM={url_id}, PAGE={page}, THREAD={thread_id}]: Failed after {attempt + 1} attempts"
                     )
-                    break
-            else:
+                    # unlike an empty page a failed one says nothing about where the reviews end
+                    pages.fail(page)
+                    pending = None
+                    if on_page:
+                        on_page(page, [])
+                    continue
+
+                # over http the browser only served this page, it goes back to the
+                # pool so its slot is free while the next pages succeed without one
+                if driver and FETCH_MODE == "http":
+                    driver_pool.release(driver)
+                    driver = None
+
+            pages.finish(page, page_reviews)
+            pending = None
+            if on_page:
+                on_page(page, page_reviews)
+            if page_reviews:
                 logger.info(
                     f"[ITEM={url_id}, PAGE={page}, THREAD={thread_id}]: Page had {len(page_reviews)} reviews"
                 )
+            else:
+                logger.info(f"[ITEM={url_id}, PAGE={page}, THREAD={thread_id}]: Page had no reviews")
     except Exception as err:
+        broken = True
         logger.error(
-            f"[ITEM={url_id}, THREAD={thread_id}]: Encountered error while scraping multiple pages | ERROR: {err}"
+            f"[ITEM={url_id}, THREAD={thread_id}]: Encountered error while scraping pages | ERROR: {err}"
         )
+        if pending is not None:
+            pages.fail(pending)
     finally:
         if driver:
-            try:
-                driver.quit()
-            except Exception as e:
-                logger.warning(
-                    f"[ITEM={url_id}, THREAD={thread_id}]: Error while quitting driver: {e}"
-                )
+            driver_pool.release(driver, broken=broken)
 
-    return range_reviews
+
+# browserless path, returns None when the page has to be loaded in a browser instead
+@timed("page_http")
+def scrape_single_page_http(url: str, page: int, owner: str = None) -> list[FlipkartReview] | None:
+    paged_url = f"{url}&page={page}"
+    if (html := fetch_html(paged_url, owner)) is None:
+        return None
+
+    raw_reviews = parse_review_html(html)
+    if raw_reviews is None:
+        logger.info(f"[PAGE={page}] Review markup missing from http response, using a browser")
+        return None
+
+    return [review for raw in raw_reviews if (review := parse_raw_review(raw))]
 
 
+# "Page X of N" out of the texts of the pagination blocks, None if there is none
+def parse_page_count(texts: list[str]) -> int | None:
+    for text in texts:
+        if "Page" in text and "of" in text:
+            try:
+                return int(text.strip().split()[-1])
+            except ValueError:
+                logger.warning(f"Unexpected pagination text: {text!r}")
+    return None
+
+
+# same output as EXTRACT_REVIEWS_JS, None if the html is not a rendered review page
+def parse_review_html(html: str) -> list[dict] | None:
+    tree = LexborHTMLParser(html)
+    review_divs = tree.css(REVIEW_SELECTORS["review"])
+    # a page past the last one has pagination but no reviews
+    if not review_divs and tree.css_first(REVIEW_SELECTORS["pages"]) is None:
+        return None
+
+    def text_of(node) -> str:
+        return node.text(separator=" ")
+
+    raw_reviews = []
+    for div in review_divs:
+        text = div.css_first(REVIEW_SELECTORS["text"])
+        rating = div.css_first(REVIEW_SELECTORS["rating"])
+        raw_reviews.append({
+            "text": text_of(text) if text else None,
+            "rating": text_of(rating) if rating else None,
+            "meta": [
+                [el.attributes.get("class") or "", text_of(el)]
+                for el in div.css(REVIEW_SELECTORS["meta"])
+            ],
+            "votes": [
+                [el.attributes.get("class") or "", text_of(el)]
+                for el in div.css(REVIEW_SELECTORS["votes"])
+            ],
+        })
+    return raw_reviews
+
+
+@timed("page_browser")
 def scrape_single_page(
-    driver: webdriver.Chrome, url: str, page: int
+    driver: "webdriver.Chrome", url: str, page: int
 ) -> list[FlipkartReview]:
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+
     paged_url = f"{url}&page={page}"
+    browser_pacer.wait(paged_url)
     logger.info(f"[PAGE={page}] Navigating to: {paged_url}")
 
     try:
@@ -120,148 +281,207 @@ def scrape_single_page(
 
     wait = WebDriverWait(driver, timeout=8.0)
     try:
-        wait.until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, "div.EKFha-")))
+        wait.until(
+            EC.presence_of_all_elements_located(
+                (By.CSS_SELECTOR, REVIEW_SELECTORS["review"])
+            )
+        )
         logger.info(f"[PAGE={page}] Found review elements on page")
     except Exception as e:
         logger.warning(f"[PAGE={page}] Review elements not found: {e}")
-        logger.info(f"[PAGE={page}] Page source length: {len(driver.page_source)}")
-        # Log first 500 chars of page source to see what we got
-        logger.info(f"[PAGE={page}] Page source preview: {driver.page_source[:500]}")
+        # page_source is a webdriver round trip, only fetched when it is logged
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"[PAGE={page}] Page source preview: {driver.page_source[:500]}")
         return []
 
-    reviews_divs = driver.find_elements(By.CSS_SELECTOR, "div.EKFha-")
-    logger.info(f"[PAGE={page}] Found {len(reviews_divs)} review divs")
-    result = []
-
-    for div in reviews_divs:
-        review = FlipkartReview(
-            text=None,
-            user=None,
-            rating=None,
-            time=None,
-            ldr=None,
-            score=None,
-            final=None,
-        )
+    return extract_page_reviews(driver, page)
 
-        try:
-            # text
-            review.text = div.find_element(By.CSS_SELECTOR, "div.ZmyHeo").text
-            review.text = clean_text(review.text)
-            # rating
-            review.rating = div.find_element(By.CSS_SELECTOR, "div.XQDdHH.Ga3i8K").text
-            review.rating = review.rating.strip()
-            # user & time
-            p_elems = div.find_elements(By.CSS_SELECTOR, "p._2NsDsF")
-            for p_elem in p_elems:
-                class_list = p_elem.get_attribute("class").split()
-                if "AwS1CA" in class_list:
-                    review.user = p_elem.text.strip()
-                elif len(class_list) == 1:
-                    review.time = p_elem.text.strip()
-            # ldr
-            ldr_elems = div.find_elements(By.CSS_SELECTOR, "div._6kK6mk")
-            review.ldr = [0, 0]
-            for ldr_elem in ldr_elems:
-                class_list = ldr_elem.get_attribute("class").split()
-                if "_6kK6mk" in class_list:
-                    if "aQymJL" in class_list:
-                        review.ldr[1] = int(ldr_elem.text.strip())
-                    else:
-                        review.ldr[0] = int(ldr_elem.text.strip())
-
-            result.append(review)
-        except:
-            pass
 
+# reviews of the page loaded in `driver`
+def extract_page_reviews(driver: "webdriver.Chrome", page: int) -> list[FlipkartReview]:
+    started = time.perf_counter()
+    try:
+        raw_reviews = driver.execute_script(EXTRACT_REVIEWS_JS, REVIEW_SELECTORS)
+    except Exception as e:
+        logger.warning(f"[PAGE={page}] Script extraction failed, walking elements: {e}")
+        raw_reviews = extract_raw_reviews_by_element(driver)
+
+    result = [review for raw in raw_reviews if (review := parse_raw_review(raw))]
+    logger.info(
+        f"[PAGE={page}] Extracted {len(result)}/{len(raw_reviews)} reviews in "
+        f"{(time.perf_counter() - started) * 1000:.1f}ms"
+    )
     return result
 
 
-def get_total_pages(url: str) -> int:
-    import time
-    import random
-
-    driver = None
+# pulls every review of the page in a single webdriver round trip
+EXTRACT_REVIEWS_JS = """
+const sel = arguments[0];
+return Array.from(document.querySelectorAll(sel.review), (div) => {
+    const text = div.querySelector(sel.text);
+    const rating = div.querySelector(sel.rating);
+    const items = (css) => Array.from(
+        div.querySelectorAll(css), (el) => [el.getAttribute("class") || "", el.innerText]
+    );
+    return {
+        text: text ? text.innerText : null,
+        rating: rating ? rating.innerText : null,
+        meta: items(sel.meta),
+        votes: items(sel.votes),
+    };
+});
+"""
+
+
+# same output as EXTRACT_REVIEWS_JS, but costs a round trip per element
+def extract_raw_reviews_by_element(driver: "webdriver.Chrome") -> list[dict]:
+    from selenium.webdriver.common.by import By
+
+    raw_reviews = []
+    for div in driver.find_elements(By.CSS_SELECTOR, REVIEW_SELECTORS["review"]):
+        texts = div.find_elements(By.CSS_SELECTOR, REVIEW_SELECTORS["text"])
+        ratings = div.find_elements(By.CSS_SELECTOR, REVIEW_SELECTORS["rating"])
+        raw_reviews.append({
+            "text": texts[0].text if texts else None,
+            "rating": ratings[0].text if ratings else None,
+            "meta": [
+                [el.get_attribute("class"), el.text]
+                for el in div.find_elements(By.CSS_SELECTOR, REVIEW_SELECTORS["meta"])
+            ],
+            "votes": [
+                [el.get_attribute("class"), el.text]
+                for el in div.find_elements(By.CSS_SELECTOR, REVIEW_SELECTORS["votes"])
+            ],
+        })
+    return raw_reviews
+
+
+# builds a review out of the markup pulled from a review div, None if it is incomplete
+def parse_raw_review(raw: dict) -> FlipkartReview | None:
+    if raw["text"] is None or raw["rating"] is None:
+        return None
+
+    review = FlipkartReview(
+        text=clean_text(raw["text"]),
+        user=None,
+        rating=raw["rating"].strip(),
+        time=None,
+        ldr=[0, 0],
+        score=None,
+        final=None,
+    )
+
+    # user & time
+    for class_name, text in raw["meta"]:
+        class_list = class_name.split()
+        if REVIEW_SELECTORS["user_class"] in class_list:
+            review.user = text.strip()
+        elif len(class_list) == 1:
+            review.time = text.strip()
+
+    # ldr
     try:
-        logger.info(f"[get_total_pages] Starting for URL: {url}")
-        driver = make_webdriver()
-        logger.info(f"[get_total_pages] WebDriver created, navigating to URL")
-
-        # Add random delay to seem more human-like
-        time.sleep(random.uniform(1, 3))
+        for class_name, text in raw["votes"]:
+            if REVIEW_SELECTORS["dislike_class"] in class_name.split():
+                review.ldr[1] = int(text.strip())
+            else:
+                review.ldr[0] = int(text.strip())
+    except ValueError:
+        return None
 
-        # Add another delay before going to Flipkart
-        time.sleep(random.uniform(2, 4))
+    return review
 
-        driver.get(url)
-        logger.info(f"[get_total_pages] Page loaded, current URL: {driver.current_url}")
-        logger.info(f"[get_total_pages] Page title: {driver.title}")
 
-        # Wait a bit for page to fully load
-        time.sleep(random.uniform(2, 5))
+# One load of page 1 gives both the page count and page 1's reviews. The reviews are
+# None when page 1 still has to be scraped, e.g. the count was not found and
+# defaults to 1.
+@timed("first_page")
+def scrape_first_page(url: str) -> tuple[int, list[FlipkartReview] | None]:
+    url_id = get_uuid(url)
+    paged_url = f"{url}&page=1"
 
-        wait = WebDriverWait(driver, timeout=10.0)  # Increased timeout
-        logger.info(f"[get_total_pages] Waiting for pagination elements...")
-        page_divs = wait.until(
-            EC.presence_of_all_elements_located((By.CSS_SELECTOR, "div._1G0WLw.mpIySA"))
+    if FETCH_MODE == "http" and (html := fetch_html(paged_url, url_id)) is not None:
+        tree = LexborHTMLParser(html)
+        page_count = parse_page_count(
+            [span.text() for span in tree.css(f"{REVIEW_SELECTORS['pages']} span")]
         )
-        logger.info(f"[get_total_pages] Found {len(page_divs)} pagination divs")
+        raw_reviews = parse_review_html(html)
+        # reviews without pagination are a product with a single page
+        if raw_reviews is not None and (page_count is not None or raw_reviews):
+            page_count = page_count or 1
+            logger.info(f"[ITEM={url_id}]: Found {page_count} pages over http")
+            return page_count, [review for raw in raw_reviews if (review := parse_raw_review(raw))]
 
-        for i, div in enumerate(page_divs):
-            try:
-                span = div.find_element(By.TAG_NAME, "span")
-                span_text = span.text
-                logger.info(f"[get_total_pages] Pagination div {i}: '{span_text}'")
-                if "Page" in span_text and "of" in span_text:
-                    total_pages = int(span_text.strip().split()[-1])
-                    logger.info(f"[get_total_pages] Found total pages: {total_pages}")
-                    return total_pages
-            except Exception as e:
-                logger.warning(
-                    f"[get_total_pages] Error processing pagination div {i}: {e}"
-                )
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
 
-        logger.error(
-            f"[ITEM={get_uuid(url)}]: Unable to find the number of pages of reviews"
-        )
-        logger.info(f"[get_total_pages] Page source length: {len(driver.page_source)}")
-        logger.info(
-            f"[get_total_pages] Page source preview: {driver.page_source[:1000]}"
+    driver = None
+    try:
+        driver = driver_pool.acquire(owner=url_id)
+        browser_pacer.wait(paged_url)
+        logger.info(f"[ITEM={url_id}]: Loading page 1 for the page count")
+        driver.get(paged_url)
+
+        wait = WebDriverWait(driver, timeout=10.0)
+        page_divs = wait.until(
+            EC.presence_of_all_elements_located(
+                (By.CSS_SELECTOR, REVIEW_SELECTORS["pages"])
+            )
         )
-        return 1
+        spans = [
+            span.text
+            for div in page_divs
+            for span in div.find_elements(By.TAG_NAME, "span")
+        ]
+        page_count = parse_page_count(spans)
+        if page_count is None:
+            logger.error(f"[ITEM={url_id}]: Unable to find the number of pages of reviews")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"[ITEM={url_id}]: Page source preview: {driver.page_source[:1000]}")
+            return 1, None
+
+        logger.info(f"[ITEM={url_id}]: Found total pages: {page_count}")
+        return page_count, extract_page_reviews(driver, 1)
     except Exception as err:
         logger.error(
-            f"[ITEM={get_uuid(url)}] Encountered error while finding the number of pages of reviews | ERROR: {err}"
+            f"[ITEM={url_id}] Encountered error while finding the number of pages of reviews | ERROR: {err}"
         )
-        if driver:
-            try:
-                logger.info(
-                    f"[get_total_pages] Error occurred, current URL: {driver.current_url}"
-                )
-                logger.info(
-                    f"[get_total_pages] Error page source length: {len(driver.page_source)}"
-                )
-                logger.info(
-                    f"[get_total_pages] Error page source preview: {driver.page_source[:1000]}"
-                )
-            except:
-                logger.warning(
-                    "[get_total_pages] Could not get page source after error"
-                )
-        return 1
+        return 1, None
     finally:
+        # a crashed browser is caught by the health probe on its next lease
         if driver:
-            driver.quit()
+            driver_pool.release(driver)
+
 
+# The lookup gives up once `deadline` (a time.monotonic() value) passes, as the
+# related stage stops waiting for it then: it neither waits for a browser past it
+# nor loads the search page after it.
+@timed("amazon")
+def get_similar_items_from_amazon(url_id: str, deadline: float = None) -> list[AmazonProduct]:
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
 
-def get_similar_items_from_amazon(url_id: str) -> list[AmazonProduct]:
     url_id = url_id.replace("-", "+")
-    driver = make_webdriver(use_proxy=True)
-    wait = WebDriverWait(driver, timeout=5.0)
+    driver = None
     results = []
 
+    def time_left() -> float:
+        return DRIVER_LEASE_TIMEOUT if deadline is None else deadline - time.monotonic()
+
     try:
-        driver.get(f"https://www.amazon.in/s?k={url_id}")
+        if time_left() <= 0:
+            logger.warning(f"[ITEM={url_id}]: Related items lookup started past its deadline")
+            return results
+        driver = driver_pool.acquire(use_proxy=True, timeout=time_left(), owner=url_id)
+        wait = WebDriverWait(driver, timeout=5.0)
+        search_url = f"https://www.amazon.in/s?k={url_id}"
+        browser_pacer.wait(search_url)
+        if time_left() <= 0:
+            logger.warning(f"[ITEM={url_id}]: Related items lookup ran past its deadline")
+            return results
+        driver.get(search_url)
 
         container_xpath = '//div[contains(@class, "puis-card-container")]'
         wait.until(EC.presence_of_all_elements_located((By.XPATH, container_xpath)))
@@ -297,6 +517,7 @@ def get_similar_items_from_amazon(url_id: str) -> list[AmazonProduct]:
             f"Encountered error while fetching similar products fromm amazon | ERROR: {err}"
         )
     finally:
-        driver.quit()
+        if driver:
+            driver_pool.release(driver)
 
     return results
@@ -0,0 +1,81 @@
+from utils import *
+from uuid import uuid4
+
+
+logger = make_logger("singleflight")
+
+# deletes the lock only if it is still owned by the caller
+_RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+# Makes sure that only one analysis per key runs at a time. Inside a process the
+# followers await the leader's task; across workers and replicas a redis lock
+# marks the leader and the followers poll `lookup` until its result is cached.
+class SingleFlight:
+    def __init__(self, redis, lock_ttl: int, poll_interval: float, wait_timeout: float):
+        self.redis = redis
+        self.lock_ttl = lock_ttl
+        self.poll_interval = poll_interval
+        self.wait_timeout = wait_timeout
+        self._inflight: dict[str, asyncio.Task] = {}
+
+    async def do(self, key: str, fn, lookup):
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._lead(key, fn, lookup))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            logger.info(f"Joining in-flight analysis for {key!r}")
+
+        # a client going away must not cancel the work other requests wait on
+        return await asyncio.shield(task)
+
+    async def _lead(self, key: str, fn, lookup):
+        if not self.redis:
+            return await fn()
+
+        lock_key = f"lock:{key}"
+        token = uuid4().hex
+        if await self._try_lock(lock_key, token):
+            try:
+                return await fn()
+            finally:
+                await self._unlock(lock_key, token)
+
+        logger.info(f"{key!r} is being processed by another worker, waiting for it")
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.wait_timeout
+        while loop.time() < deadline:
+            await asyncio.sleep(self.poll_interval)
+            if (res := await lookup()) is not None:
+                return res
+            try:
+                if not await self.redis.exists(lock_key):
+                    break
+            except Exception as e:
+                logger.warning(f"Redis exists failed: {e}")
+                break
+
+        # the other worker failed or is too slow, do the work here
+        logger.warning(f"Gave up waiting on the other worker for {key!r}")
+        return await fn()
+
+    async def _try_lock(self, lock_key: str, token: str) -> bool:
+        try:
+            return bool(await self.redis.set(lock_key, token, nx=True, ex=self.lock_ttl))
+        except Exception as e:
+            # without redis the best we can do is the in-process dedup
+            logger.warning(f"Redis lock failed: {e}")
+            return True
+
+    async def _unlock(self, lock_key: str, token: str) -> None:
+        try:
+            await self.redis.eval(_RELEASE_SCRIPT, keys=[lock_key], args=[token])
+        except Exception as e:
+            logger.warning(f"Redis unlock failed: {e}")
@@ -0,0 +1,157 @@
+from utils import *
+from cache import LocalCache
+from metrics import timed
+import os
+
+
+logger = make_logger("summarizer")
+
+SUMMARY_PROMPT = (
+    "You are given a list of user reviews. Read them all carefully and generate a concise, balanced summary that captures the overall sentiment, common themes, notable pros and cons, and any frequently mentioned issues or praises. Use clear language and aim to reflect the general consensus as well as any strong outliers. DO NOT USE POINTS. "
+    "GIVE ME A 150 WORD REVIEW, the reviews follow one per line:\n"
+)
+# part of every cache key, bump it when the prompt or the review selection changes
+PROMPT_VERSION = 2
+
+
+def estimate_tokens(text: str) -> int:
+    # about four characters per token for english text
+    return len(text) // 4 + 1
+
+
+def select_summary_texts(
+    reviews: ReviewBatch, max_count: int, token_budget: int, duplicate_similarity: float
+) -> list[str]:
+    # best reviews first by final score, skipping near duplicates of reviews already
+    # picked and reviews that do not fit into what is left of the token budget
+    selected, selected_words = [], []
+    tokens = 0
+    for i in np.argsort(-reviews.final, kind="stable").tolist():
+        text = clean_text(reviews.text[i])
+        if not text:
+            continue
+        words = set(re.findall(r"\w+", text.lower()))
+        if any(
+            len(words & other) >= duplicate_similarity * len(words | other)
+            for other in selected_words
+        ):
+            continue
+        cost = estimate_tokens(text)
+        if tokens + cost > token_budget:
+            continue
+
+        selected.append(text)
+        selected_words.append(words)
+        tokens += cost
+        if len(selected) == max_count:
+            break
+    return selected
+
+
+class GeminiBackend:
+    name = "gemini-1.5-flash"
+
+    def __init__(self):
+        self._model = None
+
+    def warm(self) -> None:
+        # google.generativeai takes about a second to import
+        if self._model is None:
+            import google.generativeai as genai
+
+            genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+            self._model = genai.GenerativeModel(self.name)
+
+    async def summarize(self, texts: list[str]) -> str:
+        if self._model is None:
+            await run_blocking(None, self.warm)
+        prompt = SUMMARY_PROMPT + "\n".join(texts)
+        return (await self._model.generate_content_async(prompt)).text
+
+
+# Offline stand-in for the llm: the opening sentence of the best reviews, cut to
+# 150 words. Lets the selection and the cache run in tests without an api key.
+class LocalBackend:
+    name = "local"
+
+    def warm(self) -> None:
+        pass
+
+    async def summarize(self, texts: list[str]) -> str:
+        sentences = [re.split(r"(?<=[.!?])\s", text, maxsplit=1)[0] for text in texts]
+        return " ".join(" ".join(sentences).split()[:150])
+
+
+# Summaries addressed by a hash of the normalized set of selected reviews, so a
+# product whose best reviews did not change skips the llm call. The call itself
+# is cut off after `timeout` seconds, failed and timed out calls are not cached.
+class Summarizer:
+    def __init__(self, backend, redis, local_size: int, ttl: int, timeout: float):
+        self.backend = backend
+        self.redis = redis
+        self.ttl = ttl
+        self.timeout = timeout
+        self.local = LocalCache(local_size, ttl)
+        self.counters = {"hit": 0, "miss": 0, "timeout": 0, "failed": 0}
+
+    def key(self, texts: list[str]) -> str:
+        normalized = sorted(" ".join(text.lower().split()) for text in texts)
+        digest = hashlib.sha1("\x1e".join(normalized).encode()).hexdigest()
+        return f"summary:{self.backend.name}:{PROMPT_VERSION}:{digest}"
+
+    async def summarize(self, reviews: ReviewBatch) -> str:
+        texts = select_summary_texts(
+            reviews, LLM_REVIEW_COUNT, LLM_TOKEN_BUDGET, LLM_DUPLICATE_SIMILARITY
+        )
+        if not texts:
+            return ""
+
+        key = self.key(texts)
+        if (summary := await self._get(key)) is not None:
+            self.counters["hit"] += 1
+            return summary
+        self.counters["miss"] += 1
+
+        try:
+            with timed("llm"):
+                summary = await asyncio.wait_for(self.backend.summarize(texts), self.timeout)
+        except asyncio.TimeoutError:
+            self.counters["timeout"] += 1
+            logger.error(f"LLM summary timed out after {self.timeout}s")
+            return ""
+        except Exception as err:
+            self.counters["failed"] += 1
+            logger.error(f"Encountered error while generating llm summary | ERROR: {err}")
+            return ""
+
+        summary = clean_text(summary)
+        logger.info(f"Generated llm response of size = {len(summary)} from {len(texts)} reviews")
+        if summary:
+            await self._set(key, summary)
+        return summary
+
+    def stats(self) -> dict[str]:
+        return {**self.counters, "local_entries": len(self.local)}
+
+    async def _get(self, key: str) -> str | None:
+        if (summary := self.local.get(key)) is not None:
+            return summary
+        if not self.redis:
+            return None
+        try:
+            summary = await self.redis.get(key)
+        except Exception as e:
+            logger.warning(f"Redis get failed: {e}")
+            return None
+        if summary:
+            self.local.set(key, summary)
+        return summary or None
+
+    async def _set(self, key: str, summary: str) -> None:
+        self.local.set(key, summary)
+        if not self.redis:
+            return
+        try:
+            await self.redis.set(key, summary, ex=self.ttl)
+        except Exception as e:
+            logger.warning(f"Redis set failed: {e}")
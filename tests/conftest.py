@@ -0,0 +1,7 @@
+import os
+import sys
+
+# the modules live at the repository root and open the models by relative path
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
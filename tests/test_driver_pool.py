@@ -0,0 +1,76 @@
+import threading
+import time
+
+import driver_pool as pool_module
+from driver_pool import DriverPool
+from governor import FairSlots
+
+
+class FakeDriver:
+    alive = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def __init__(self):
+        with FakeDriver.lock:
+            FakeDriver.alive += 1
+            FakeDriver.peak = max(FakeDriver.peak, FakeDriver.alive)
+
+    def execute_script(self, script):
+        return 1
+
+    def quit(self):
+        with FakeDriver.lock:
+            FakeDriver.alive -= 1
+
+
+def slow_webdriver(use_proxy=False, profile_dir=None):
+    time.sleep(0.2)
+    return FakeDriver()
+
+
+def make_pool(monkeypatch, size, max_age=60.0):
+    FakeDriver.alive = FakeDriver.peak = 0
+    monkeypatch.setattr(pool_module, "make_webdriver", slow_webdriver)
+    return DriverPool(FairSlots("browser", size), max_uses=50, max_age=max_age, reap_interval=60)
+
+
+def test_concurrent_creations_stay_within_size(monkeypatch):
+    pool = make_pool(monkeypatch, size=2)
+    pool.release(pool.acquire())
+
+    # both proxied leases start a browser while a plain one sits idle
+    leased = []
+    threads = [
+        threading.Thread(target=lambda: leased.append(pool.acquire(use_proxy=True)))
+        for _ in range(2)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(leased) == 2
+    assert FakeDriver.peak <= 2
+    assert pool.stats()["creating"] == 0
+    for driver in leased:
+        pool.release(driver)
+    pool.close()
+    assert FakeDriver.alive == 0
+
+
+def test_idle_drivers_past_max_age_are_reaped(monkeypatch):
+    pool = make_pool(monkeypatch, size=2, max_age=0.3)
+    first, second = pool.acquire(), pool.acquire()
+    pool.release(first)
+    time.sleep(0.3)
+
+    # releasing a driver also sweeps the idle ones past their age
+    pool.release(second)
+    assert pool.stats()["idle"] == 0
+    assert FakeDriver.alive == 0
+
+    pool.release(pool.acquire())
+    time.sleep(0.3)
+    assert pool.reap() == 1
+    assert FakeDriver.alive == 0
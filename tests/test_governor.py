@@ -0,0 +1,42 @@
+import governor as governor_module
+from governor import Governor
+
+from test_driver_pool import make_pool
+
+
+def make_governor(monkeypatch, free_mb: float) -> Governor:
+    monkeypatch.setattr(governor_module, "available_memory_mb", lambda: free_mb)
+    return Governor(
+        browser_slots=8, fetch_slots=8, threads_per_request=4,
+        browser_memory_mb=300, memory_reserve_mb=512,
+    )
+
+
+def test_idle_browsers_count_towards_the_memory_cap(monkeypatch):
+    pool = make_pool(monkeypatch, size=8)
+    drivers = [pool.acquire() for _ in range(8)]
+    for driver in drivers:
+        pool.release(driver)
+    assert pool.idle_count() == 8
+
+    # the warm pool uses most of the memory, but it is exactly what the scrape reuses
+    governor = make_governor(monkeypatch, free_mb=600)
+    with governor.admit("item", idle_browsers=0) as threads:
+        assert threads == 1
+    with governor.admit("item", idle_browsers=pool.idle_count()) as threads:
+        assert threads == 4
+    pool.close()
+
+
+def test_new_browsers_are_capped_by_free_memory(monkeypatch):
+    governor = make_governor(monkeypatch, free_mb=512 + 2 * 300)
+    with governor.admit("item", idle_browsers=1) as threads:
+        assert threads == 3
+
+
+def test_http_page_threads_skip_the_memory_cap(monkeypatch):
+    governor = make_governor(monkeypatch, free_mb=100)
+    with governor.admit("item", uses_browsers=False) as threads:
+        assert threads == 4
+    with governor.admit("item") as threads:
+        assert threads == 1
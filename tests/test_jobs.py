@@ -0,0 +1,47 @@
+import asyncio
+
+from jobs import JobQueue
+
+
+class DictRedis:
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        await asyncio.sleep(0)
+        self.data[key] = value
+
+
+def test_jobs_are_visible_to_other_workers():
+    async def run():
+        release = asyncio.Event()
+
+        async def analyse(url, progress):
+            progress(pages_scraped=1)
+            await release.wait()
+            return {"Reviews": [], "url": url}
+
+        redis = DictRedis()
+        # two api workers sharing redis, only the first one runs jobs
+        accepting = JobQueue(analyse, redis, workers=1, maxsize=5, ttl=60)
+        other = JobQueue(analyse, redis, workers=1, maxsize=5, ttl=60)
+        accepting.start()
+
+        job = accepting.submit("https://www.flipkart.com/x")
+        await asyncio.sleep(0.01)
+        seen = await other.get(job.id)
+        assert seen.status == "running"
+        assert seen.progress == {"pages_scraped": 1}
+
+        release.set()
+        await asyncio.sleep(0.01)
+        seen = await other.get(job.id)
+        assert seen.status == "done"
+        assert seen.result == {"Reviews": [], "url": "https://www.flipkart.com/x"}
+        assert await other.get("unknown") is None
+        await accepting.stop()
+
+    asyncio.run(run())
@@ -0,0 +1,61 @@
+import time
+
+from page_queue import PageQueue
+
+
+URL = "https://www.flipkart.com/phone/product-reviews/itm1?pid=1"
+
+
+def drain(pages: PageQueue, results: dict) -> list[int]:
+    taken = []
+    while (task := pages.take()) is not None:
+        page, attempt = task
+        taken.append(page)
+        if results[page] is None:
+            pages.fail(page)
+        else:
+            pages.finish(page, results[page])
+    return taken
+
+
+def test_failed_pages_do_not_mark_the_end():
+    # pages 2 to 4 were rate limited, the reviews go on until page 6
+    results = {page: ["review"] for page in range(1, 7)}
+    results.update({2: None, 3: None, 4: None, 7: [], 8: [], 9: [], 10: []})
+    pages = PageQueue(range(1, 11), max_attempts=1, max_empty=3, retry_delay=0)
+
+    taken = drain(pages, results)
+
+    assert taken == list(range(1, 10))
+    assert pages.end == 6
+    assert pages.reviews() == ["review"] * 3
+    assert pages.stats()["failed"] == 3
+    assert pages.stats()["cancelled"] == 1
+
+
+def test_a_thread_that_dies_does_not_strand_its_page(monkeypatch):
+    import threading
+
+    import scraper
+
+    def fake_page(url, page, owner=None):
+        if page == 2:
+            raise ValueError("unexpected markup")
+        # the survivor waits until the other thread is stuck on page 2
+        time.sleep(0.05)
+        return ["review"] if page < 5 else []
+
+    monkeypatch.setattr(scraper, "FETCH_MODE", "http")
+    monkeypatch.setattr(scraper, "scrape_single_page_http", fake_page)
+    pages = PageQueue(range(1, 11), max_attempts=1, max_empty=3, retry_delay=0)
+    threads = [
+        threading.Thread(target=scraper.scrape_queued_pages, args=(URL, pages, thread_id), daemon=True)
+        for thread_id in range(2)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert not any(thread.is_alive() for thread in threads)
+    assert pages.stats()["failed"] == 1
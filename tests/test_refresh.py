@@ -0,0 +1,100 @@
+import scraper
+from utils import FlipkartReview
+
+
+URL = "https://www.flipkart.com/phone/product-reviews/itm1?pid=1"
+
+
+def review(i: int, time: str) -> FlipkartReview:
+    return FlipkartReview(
+        text=f"review number {i}", user=f"user {i}", rating="5", time=time,
+        ldr=[i, 0], score=None, final=None,
+    )
+
+
+def stored_pages(reviews: list[FlipkartReview], page_size: int) -> list[dict]:
+    return [
+        {"page": start // page_size + 1, "reviews": [r.dump() for r in reviews[start:start + page_size]]}
+        for start in range(0, len(reviews), page_size)
+    ]
+
+
+def test_fingerprint_ignores_relative_time_and_votes():
+    old = review(1, "2 days ago")
+    new = review(1, "5 days ago")
+    new.ldr = [7, 2]
+    new.text = "  Review   number 1 "
+    assert old.fingerprint() == new.fingerprint()
+    assert old.fingerprint() != review(2, "2 days ago").fingerprint()
+
+
+def test_refresh_keeps_reviews_whose_time_changed_once(monkeypatch):
+    stored = [review(i, "2 days ago") for i in range(30)]
+    # two new reviews on top, everything else shifted down and three days older
+    site = [review(i, "just now") for i in (100, 101)] + [review(i, "5 days ago") for i in range(30)]
+    loaded = []
+
+    def fake_page(url, page, owner=None):
+        loaded.append(page)
+        return site[(page - 1) * 10:page * 10]
+
+    monkeypatch.setattr(scraper, "FETCH_MODE", "http")
+    monkeypatch.setattr(scraper, "scrape_single_page_http", fake_page)
+
+    merged = scraper.refresh_reviews(URL, stored_pages(stored, 10))
+
+    assert loaded == [1]
+    assert len(merged) == 32
+    assert len({r.text for r in merged}) == 32
+    assert [r.text for r in merged[:2]] == ["review number 100", "review number 101"]
+    # the walked copies replace the stored ones
+    assert {r.time for r in merged[2:10]} == {"5 days ago"}
+    assert {r.time for r in merged[10:]} == {"2 days ago"}
+
+
+def generic(i: int, time: str) -> FlipkartReview:
+    return FlipkartReview(
+        text="Good", user="Flipkart Customer", rating="5", time=time,
+        ldr=[i, 0], score=None, final=None,
+    )
+
+
+def serve(monkeypatch, site: list[FlipkartReview], page_size: int) -> list[int]:
+    loaded = []
+
+    def fake_page(url, page, owner=None):
+        loaded.append(page)
+        return site[(page - 1) * page_size:page * page_size]
+
+    monkeypatch.setattr(scraper, "FETCH_MODE", "http")
+    monkeypatch.setattr(scraper, "scrape_single_page_http", fake_page)
+    return loaded
+
+
+def test_refresh_keeps_reviews_sharing_user_and_text(monkeypatch):
+    stored = [generic(0, "1 day ago"), review(1, "1 day ago"), generic(2, "1 day ago"),
+              generic(3, "1 day ago"), review(4, "1 day ago")]
+    site = [generic(0, "3 days ago"), review(1, "3 days ago"), generic(2, "3 days ago"),
+            generic(3, "3 days ago"), review(4, "3 days ago")]
+    loaded = serve(monkeypatch, site, 5)
+
+    merged = scraper.refresh_reviews(URL, stored_pages(stored, 5))
+
+    assert loaded == [1]
+    assert len(merged) == 5
+    assert [r.text for r in merged] == [r.text for r in site]
+    assert {r.time for r in merged} == {"3 days ago"}
+
+
+def test_generic_new_review_does_not_end_the_walk(monkeypatch):
+    stored = [generic(0, "1 day ago")] + [review(i, "1 day ago") for i in range(1, 5)]
+    # a full page of new reviews, one of them as generic as a stored one
+    new = [review(i, "just now") for i in range(100, 103)] + [generic(9, "just now"), review(103, "just now")]
+    site = new + [generic(0, "1 day ago")] + [review(i, "1 day ago") for i in range(1, 5)]
+    loaded = serve(monkeypatch, site, 5)
+
+    merged = scraper.refresh_reviews(URL, stored_pages(stored, 5))
+
+    assert loaded == [1, 2]
+    assert len(merged) == 10
+    assert [r.ldr[0] for r in merged if r.text == "Good"] == [9, 0]
@@ -0,0 +1,50 @@
+import json
+
+from fastapi.testclient import TestClient
+
+import main
+import scraper
+from utils import run_blocking
+
+
+URL = "https://www.flipkart.com/phone/product-reviews/itm1?pid=1"
+# a page past the last one: pagination but no reviews
+EMPTY_PAGE = '<html><body><div class="_1G0WLw mpIySA"><span>Page 4 of 3</span></div></body></html>'
+
+
+def test_page_thread_stages_reach_the_server_timing_header(monkeypatch):
+    monkeypatch.setattr(scraper, "FETCH_MODE", "http")
+    monkeypatch.setattr(scraper, "scrape_first_page", lambda url: (3, None))
+    monkeypatch.setattr(scraper, "fetch_html", lambda url, owner=None: EMPTY_PAGE)
+
+    async def analyse_url(url, progress=None, emit=None):
+        reviews = await run_blocking(main.scrape_executor, scraper.scrape_reviews, url)
+        return {"Reviews": [r.format() for r in reviews]}
+
+    monkeypatch.setattr(main, "analyse_url", analyse_url)
+
+    response = TestClient(main.app).post("/analyse", json={"url": URL})
+
+    assert response.status_code == 200
+    stages = dict(
+        entry.split(";dur=") for entry in response.headers["Server-Timing"].split(", ")
+    )
+    # timed on a page thread of the scrape, which runs on a scrape executor thread
+    assert "page_http" in stages
+    assert float(stages["page_http"]) >= 0
+    assert "total" in stages
+
+
+def test_streamed_analyses_leave_the_header_off(monkeypatch):
+    async def analyse_url(url, progress=None, emit=None):
+        emit("page", {"page": 1, "reviews": 0})
+        return {"Reviews": [], "Timings": {"scrape": 0.1}}
+
+    monkeypatch.setattr(main, "analyse_url", analyse_url)
+
+    response = TestClient(main.app).post("/analyse/stream", json={"url": URL})
+
+    assert response.status_code == 200
+    assert "Server-Timing" not in response.headers
+    done = json.loads(response.text.splitlines()[-1])
+    assert done == {"event": "done", "data": {"Reviews": [], "Timings": {"scrape": 0.1}}}
@@ -0,0 +1,78 @@
+import asyncio
+
+import numpy as np
+
+from summarizer import LocalBackend, Summarizer, select_summary_texts
+from utils import FlipkartReview, ReviewBatch
+
+
+TEXTS = [
+    "Battery lasts two days. Charging is quick too.",
+    "Camera is sharp in daylight but noisy at night.",
+    "The display is bright and the colours look great.",
+]
+
+
+def batch(texts: list[str], finals: list[float]) -> ReviewBatch:
+    reviews = ReviewBatch.from_reviews([
+        FlipkartReview(text=text, user="u", rating="5", time="t", ldr=[0, 0], score=None, final=None)
+        for text in texts
+    ])
+    reviews.final = np.array(finals, dtype=np.float64)
+    return reviews
+
+
+class SlowBackend:
+    name = "slow"
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.calls = 0
+
+    async def summarize(self, texts: list[str]) -> str:
+        self.calls += 1
+        await asyncio.sleep(self.seconds)
+        return "too late"
+
+
+class FailingBackend(SlowBackend):
+    async def summarize(self, texts: list[str]) -> str:
+        self.calls += 1
+        raise RuntimeError("quota exceeded")
+
+
+def test_summaries_are_cached_by_selected_reviews():
+    summarizer = Summarizer(LocalBackend(), None, local_size=10, ttl=60, timeout=1.0)
+
+    async def run():
+        first = await summarizer.summarize(batch(TEXTS, [0.9, 0.5, 0.1]))
+        # the same reviews picked in another order share the cache entry
+        second = await summarizer.summarize(batch(TEXTS[::-1], [0.9, 0.5, 0.1]))
+        third = await summarizer.summarize(batch(TEXTS[:2], [0.9, 0.5]))
+        return first, second, third
+
+    first, second, third = asyncio.run(run())
+    assert first.startswith("Battery lasts two days.")
+    assert second == first
+    assert third != first
+    assert summarizer.stats()["hit"] == 1
+    assert summarizer.stats()["miss"] == 2
+
+
+def test_timed_out_and_failed_calls_are_not_cached():
+    for backend, counter in ((SlowBackend(0.5), "timeout"), (FailingBackend(0), "failed")):
+        summarizer = Summarizer(backend, None, local_size=10, ttl=60, timeout=0.05)
+
+        async def run():
+            return [await summarizer.summarize(batch(TEXTS, [0.9, 0.5, 0.1])) for _ in range(2)]
+
+        assert asyncio.run(run()) == ["", ""]
+        assert backend.calls == 2
+        assert summarizer.stats()[counter] == 2
+        assert summarizer.stats()["local_entries"] == 0
+
+
+def test_selection_skips_near_duplicates_and_respects_the_budget():
+    texts = [TEXTS[0], TEXTS[0] + " Really", TEXTS[1], "word " * 400]
+    selected = select_summary_texts(batch(texts, [0.9, 0.8, 0.7, 0.6]), 10, 50, 0.8)
+    assert selected == [TEXTS[0], TEXTS[1]]
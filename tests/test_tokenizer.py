@@ -0,0 +1,33 @@
+import nltk
+import pytest
+from nltk.tokenize import NLTKWordTokenizer, word_tokenize
+
+import ml_models
+from benchmarks.tokenizer import EXTRA_WORDS, make_reviews
+
+
+# the synthetic corpus of benchmarks/tokenizer.py plus every edge case word alone
+CORPUS = make_reviews(5000) + EXTRA_WORDS + [f"it was {word} ok" for word in EXTRA_WORDS]
+
+
+def has_punkt() -> bool:
+    try:
+        nltk.data.find("tokenizers/punkt_tab/english/")
+    except LookupError:
+        return False
+    return True
+
+
+def test_single_sentence_tokens_match_nltk():
+    tokenizer = NLTKWordTokenizer()
+    # texts without a period before their end never go through punkt
+    texts = [text for text in CORPUS if "." not in text.rstrip()[:-1]]
+    assert len(texts) > 1000
+    mismatches = [text for text in texts if ml_models._tokenize(text) != tokenizer.tokenize(text)]
+    assert not mismatches, mismatches[:5]
+
+
+@pytest.mark.skipif(not has_punkt(), reason="punkt_tab is not installed")
+def test_tokens_match_word_tokenize():
+    mismatches = [text for text in CORPUS if ml_models._tokenize(text) != word_tokenize(text)]
+    assert not mismatches, mismatches[:5]
@@ -1,11 +1,20 @@
 from constants import *
 import tempfile
-from selenium import webdriver
 from logging import getLogger, StreamHandler, Formatter
 from dataclasses import dataclass
 from pydantic import BaseModel
+from functools import partial
+from typing import TYPE_CHECKING
+import contextvars
+import asyncio
+import numpy as np
+import hashlib
 import re
 
+# selenium is only imported once a browser is started, see make_webdriver
+if TYPE_CHECKING:
+    from selenium import webdriver
+
 
 def make_logger(name):
     logger = getLogger(name)
@@ -23,12 +32,20 @@ def make_logger(name):
 logger = make_logger("api")
 
 
+async def run_blocking(executor, func, *args):
+    # runs a blocking function on `executor` so that the event loop stays free, in
+    # a copy of the caller's context so its stage timings reach the request
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(executor, partial(context.run, func, *args))
+
+
 # used by fast api to create docs and automatic parsing of json body
 class UrlRequest(BaseModel):
     url: str
 
 
-@dataclass
+@dataclass(slots=True)
 class FlipkartReview:
     text: str
     user: str
@@ -49,6 +66,29 @@ class FlipkartReview:
             "final_score": self.final,
         }
 
+    # only the scraped fields, used to store reviews between scrapes
+    def dump(self) -> dict[str]:
+        return {
+            "text": self.text,
+            "user": self.user,
+            "rating": self.rating,
+            "time": self.time,
+            "ldr": self.ldr,
+        }
+
+    @classmethod
+    def load(cls, data: dict[str]) -> "FlipkartReview":
+        return cls(**data, score=None, final=None)
+
+    # identifies a review across scrapes, votes and the relative time ("2 days ago")
+    # are left out as they keep changing. Generic reviews ("Flipkart Customer",
+    # "Good") share a fingerprint, so matches have to be counted one for one.
+    def fingerprint(self) -> str:
+        user = " ".join((self.user or "").lower().split())
+        text = " ".join((self.text or "").lower().split())
+        rating = (self.rating or "").strip()
+        return hashlib.sha1(f"{user}\x1f{rating}\x1f{text}".encode()).hexdigest()[:16]
+
 
 @dataclass
 class AmazonProduct:
@@ -66,20 +106,33 @@ class AmazonProduct:
         }
 
 
-def make_webdriver(use_proxy=False):
+# Use different user agents to avoid detection
+USER_AGENTS = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+]
+
+
+# Cuts what a scraping browser downloads: scrapers only read the DOM, so images,
+# media, fonts and stylesheets are blocked through devtools. Images are also
+# turned off in the profile prefs, which holds even if devtools is unavailable.
+def block_heavy_resources(driver: "webdriver.Chrome") -> None:
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": DRIVER_BLOCKED_URLS})
+    except Exception as err:
+        logger.warning(f"Could not block resources through devtools | ERROR: {err}")
+
+
+def make_webdriver(use_proxy=False, profile_dir=None, lean=DRIVER_LEAN):
+    from selenium import webdriver
     from selenium.webdriver.chrome.service import Service
     import os
     import time
     import random
 
-    # Use different user agents to avoid detection
-    user_agents = [
-        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36",
-        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-        "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-    ]
-
     proxies = [
         "23.95.150.145:6114",
         "198.23.239.134:6540",
@@ -93,10 +146,11 @@ def make_webdriver(use_proxy=False):
         "142.147.128.93:6593",
     ]
 
-    selected_user_agent = random.choice(user_agents)
+    selected_user_agent = random.choice(USER_AGENTS)
 
-    temp_dir = tempfile.mkdtemp()
-    print(f"Creating temporary directory: {temp_dir}")
+    # the caller owns `profile_dir` and is responsible for deleting it (see driver_pool)
+    temp_dir = profile_dir or tempfile.mkdtemp(prefix=DRIVER_PROFILE_PREFIX)
+    logger.info(f"Using profile directory: {temp_dir}")
 
     options = [
         f"--user-agent={selected_user_agent}",
@@ -142,6 +196,13 @@ def make_webdriver(use_proxy=False):
     webdriver_options.add_experimental_option("excludeSwitches", ["enable-automation"])
     webdriver_options.add_experimental_option("useAutomationExtension", False)
 
+    if lean:
+        # get() returns once the DOM is parsed, WebDriverWait then waits for the reviews
+        webdriver_options.page_load_strategy = "eager"
+        webdriver_options.add_experimental_option(
+            "prefs", {"profile.managed_default_content_settings.images": 2}
+        )
+
     for opt in options:
         webdriver_options.add_argument(opt)
 
@@ -174,13 +235,16 @@ def make_webdriver(use_proxy=False):
                 logger.info(
                     f"Created webdriver.Chrome instance with driver at {driver_path} (attempt {attempt + 1})"
                 )
-                return driver
             else:
                 # Fallback to default (may not work on ARM64)
                 logger.warning(
                     "ChromeDriver not found in expected locations, using default"
                 )
-                return webdriver.Chrome(options=webdriver_options)
+                driver = webdriver.Chrome(options=webdriver_options)
+
+            if lean:
+                block_heavy_resources(driver)
+            return driver
         except Exception as e:
             logger.error(
                 f"Failed to create webdriver (attempt {attempt + 1}/{max_retries}): {e}"
@@ -191,18 +255,142 @@ def make_webdriver(use_proxy=False):
                 raise e
 
 
-def score_reviews(reviews: list[FlipkartReview]) -> None:
-    overall_ldr = get_overall_ldr(reviews)
+# Reviews of a product as columns: the scraped strings stay python lists, votes
+# and scores are numpy arrays so scoring and aggregates run over whole pages.
+# Scores that were not computed yet are nan.
+class ReviewBatch:
+    SCORE_KEYS = ("ldr", "eng", "len", "sent", "plag")
+    __slots__ = ("text", "user", "rating", "time", "likes", "dislikes", "scores", "final")
+
+    def __init__(self, text, user, rating, time, likes, dislikes, scores=None, final=None):
+        self.text: list[str] = text
+        self.user: list[str] = user
+        self.rating: list[str] = rating
+        self.time: list[str] = time
+        self.likes: np.ndarray = likes
+        self.dislikes: np.ndarray = dislikes
+        self.scores: dict[str, np.ndarray] = scores or {
+            key: np.full(len(text), np.nan) for key in self.SCORE_KEYS
+        }
+        self.final: np.ndarray = np.full(len(text), np.nan) if final is None else final
+
+    @classmethod
+    def from_reviews(cls, reviews: list[FlipkartReview]) -> "ReviewBatch":
+        return cls(
+            [r.text for r in reviews],
+            [r.user for r in reviews],
+            [r.rating for r in reviews],
+            [r.time for r in reviews],
+            np.fromiter((r.ldr[0] for r in reviews), dtype=np.int64, count=len(reviews)),
+            np.fromiter((r.ldr[1] for r in reviews), dtype=np.int64, count=len(reviews)),
+        )
+
+    @classmethod
+    def concat(cls, batches: list["ReviewBatch"]) -> "ReviewBatch":
+        if not batches:
+            return cls.from_reviews([])
+        return cls(
+            [text for batch in batches for text in batch.text],
+            [user for batch in batches for user in batch.user],
+            [rating for batch in batches for rating in batch.rating],
+            [time for batch in batches for time in batch.time],
+            np.concatenate([batch.likes for batch in batches]),
+            np.concatenate([batch.dislikes for batch in batches]),
+            {
+                key: np.concatenate([batch.scores[key] for batch in batches])
+                for key in cls.SCORE_KEYS
+            },
+            np.concatenate([batch.final for batch in batches]),
+        )
+
+    def __len__(self) -> int:
+        return len(self.text)
+
+    # same shape as FlipkartReview.format() for every review
+    def format(self) -> list[dict[str]]:
+        scores = [self.scores[key].tolist() for key in self.SCORE_KEYS]
+        return [
+            {
+                "review": text,
+                "user": user,
+                "rating": rating,
+                "time": time,
+                "ldr": [likes, dislikes],
+                "score": dict(zip(self.SCORE_KEYS, review_scores)),
+                "final_score": final,
+            }
+            for text, user, rating, time, likes, dislikes, final, *review_scores in zip(
+                self.text,
+                self.user,
+                self.rating,
+                self.time,
+                self.likes.tolist(),
+                self.dislikes.tolist(),
+                self.final.tolist(),
+                *scores,
+            )
+        ]
+
+
+# model scores already in the batch are kept, so reviews can be re-scored
+# once the final `overall_ldr` is known
+def score_reviews(reviews: ReviewBatch, overall_ldr: float = None) -> None:
+    if overall_ldr is None:
+        overall_ldr = get_overall_ldr(reviews)
+
+    lengths = np.fromiter(map(len, reviews.text), dtype=np.float64, count=len(reviews))
+    votes = reviews.likes + reviews.dislikes
+    review_ldr = np.divide(
+        reviews.likes - reviews.dislikes,
+        votes,
+        out=np.zeros(len(reviews)),
+        where=votes != 0,
+    )
+    reviews.scores["ldr"] = 1.0 - np.abs(review_ldr - overall_ldr)
+    reviews.scores["eng"] = np.minimum(votes / 10, 1.0)
+    reviews.scores["len"] = np.minimum(lengths / 300, 1.0)
+
+
+# running aggregates over the reviews of a product, they can be filled page by page
+class ReviewStats:
+    def __init__(self):
+        self.count = 0
+        self.likes = 0
+        self.dislikes = 0
+        self.final_sum = 0.0
+        self.sent_sum = 0.0
+        self.fake_count = 0
+
+    @property
+    def overall_ldr(self) -> float:
+        if self.likes + self.dislikes == 0:
+            return 0.0
+        return (self.likes - self.dislikes) / (self.likes + self.dislikes)
+
+    def add_votes(self, reviews: ReviewBatch) -> None:
+        self.likes += int(reviews.likes.sum())
+        self.dislikes += int(reviews.dislikes.sum())
+
+    # reviews must have their final score set
+    def add_scores(self, reviews: ReviewBatch) -> None:
+        self.count += len(reviews)
+        self.final_sum += float(reviews.final.sum())
+        self.sent_sum += float(reviews.scores["sent"].sum())
+        self.fake_count += int((reviews.scores["plag"] > 0.5).sum())
 
-    for review in reviews:
-        length_score = min(len(review.text) / 300, 1.0)
-        review_ldr = get_single_ldr(review)
-        ldr_aligment = 1.0 - abs(review_ldr - overall_ldr)
-        engagement = min(sum(review.ldr) / 10, 1.0)
-        review.score = {
-            "ldr": ldr_aligment,
-            "eng": engagement,
-            "len": length_score,
+    def format(self) -> dict[str]:
+        if not self.count:
+            return {
+                "ReviewsScraped": 0,
+                "SentimentScore": 0,
+                "UserSentiment": "neutral",
+                "FakeRatio": 0,
+            }
+        return {
+            "ReviewsScraped": self.count,
+            "SentimentScore": round(self.sent_sum / self.count * 100),
+            "UserSentiment": get_sentiment_text(self.final_sum / self.count),
+            "FakeRatio": round(self.fake_count / self.count * 100),
         }
 
 
@@ -233,32 +421,9 @@ def clean_text(string: str) -> str:
     return string
 
 
-def batch_pages(page_count: int) -> list[tuple[int, int]]:
-    page_count = min(page_count, MAX_REVIEW_PAGES)
-    batches = []
-    pages_per_thread, remainder = divmod(page_count, NUM_THREADS)
-
-    start = 1
-    for i in range(NUM_THREADS):
-        end = start + pages_per_thread + (i < remainder)
-        if start < end:
-            batches.append((start, end - 1))
-        start = end
-
-    return batches
-
-
-def get_overall_ldr(reviews: list[FlipkartReview]) -> float:
-    likes = sum(rev.ldr[0] for rev in reviews)
-    dislikes = sum(rev.ldr[1] for rev in reviews)
-    if likes + dislikes == 0:
-        return 0.0
-    return (likes - dislikes) / (likes + dislikes)
-
-
-def get_single_ldr(review: FlipkartReview) -> float:
-    likes = review.ldr[0]
-    dislikes = review.ldr[1]
+def get_overall_ldr(reviews: ReviewBatch) -> float:
+    likes = int(reviews.likes.sum())
+    dislikes = int(reviews.dislikes.sum())
     if likes + dislikes == 0:
         return 0.0
     return (likes - dislikes) / (likes + dislikes)